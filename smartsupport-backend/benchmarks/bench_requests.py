@@ -0,0 +1,64 @@
+"""Micro-benchmark for the hot ticket routes.
+
+Measures Python CPU time (time.process_time) per request for the ticket
+list, ticket detail and stats routes against an in-memory database seeded
+with TICKETS tickets. Run from smartsupport-backend:
+
+    python benchmarks/bench_requests.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.testing import create_test_app
+
+TICKETS = 500
+COMMENTS_PER_TICKET = 5
+ITERATIONS = 300
+
+def seed(app):
+    from src.models.user import db, Comment, Ticket, TicketStatus, User
+    with app.app_context():
+        status = TicketStatus.query.filter_by(name='Open').first()
+        end_user = User.query.filter_by(email='user@example.com').first()
+        agent = User.query.filter_by(email='agent@smartsupport.com').first()
+        for i in range(TICKETS):
+            ticket = Ticket(
+                subject=f'Benchmark ticket {i}',
+                description='Something is broken',
+                priority=['Low', 'Medium', 'High', 'Critical'][i % 4],
+                status=status.id,
+                created_by=end_user.id,
+                assigned_to=agent.id if i % 2 else None
+            )
+            db.session.add(ticket)
+            db.session.flush()
+            for j in range(COMMENTS_PER_TICKET):
+                db.session.add(Comment(ticket_id=ticket.id, user_id=agent.id, comment_text=f'Reply {j}'))
+        db.session.commit()
+        return Ticket.query.order_by(Ticket.id.desc()).first().id
+
+def measure(client, path):
+    client.get(path)  # warm up caches
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        response = client.get(path)
+        assert response.status_code == 200, response.status_code
+    return (time.process_time() - start) / ITERATIONS * 1000
+
+def main():
+    app, template = create_test_app()
+    ticket_id = seed(app)
+    for email, password in [('admin@smartsupport.com', 'admin123'), ('agent@smartsupport.com', 'agent123'),
+                            ('user@example.com', 'user123')]:
+        client = app.test_client()
+        client.post('/api/auth/login', json={'email': email, 'password': password})
+        print(f'{email}')
+        for label, path in [('list', '/api/tickets?per_page=10'), ('detail', f'/api/tickets/{ticket_id}'),
+                            ('stats', '/api/tickets/stats')]:
+            print(f'  {label:<7} {measure(client, path):7.3f} ms CPU/request')
+
+if __name__ == '__main__':
+    main()
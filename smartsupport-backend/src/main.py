@@ -3,12 +3,31 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+import click
+import multiprocessing
+import signal
+import sqlite3
+import tarfile
+import tempfile
+import time
+from flask import Flask, send_from_directory, g
 from flask_cors import CORS
+from sqlalchemy.schema import CreateIndex
 from src.models.user import db, User, TicketStatus, Category, SLAPolicy
 from src.routes.auth import auth_bp
-from src.routes.tickets import tickets_bp
+from src.routes.tickets import tickets_bp  # also registers the audit-logs and ticket-rollups backfills
 from src.routes.admin import admin_bp
+from src.routes.reports import reports_bp
+from src.routes.batch import batch_bp
+from src.services.backfill import BACKFILLS, backfill_status, run_backfill
+from src.services.jobs import queue_counts, work
+from src.services.inbound_email import import_mailbox
+from src.services.duplicates import rebuild_index
+from src.services.user_index import rebuild_user_index
+from src.services.admission import init_admission
+from src.services.attachments import archive_path_for, export_blobs, import_blobs
+from src.services.slow_queries import init_slow_query_log
+from src.services.tenants import DEFAULT_TENANT, get_tenant_engine, is_valid_tenant, tenant_db_path, tenant_exists
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -20,13 +39,46 @@ CORS(app, supports_credentials=True)
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(tickets_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/api/admin')
+app.register_blueprint(reports_bp, url_prefix='/api/reports')
+app.register_blueprint(batch_bp, url_prefix='/api')
+
+# Admission control
+app.config['ADMISSION_MAX_CONCURRENCY'] = 32
+init_admission(app)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'SMARTSUPPORT_DATABASE_URI',
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Each additional organization gets its own SQLite file here; the default
+# organization keeps using app.db above
+app.config['TENANT_DATABASE_DIR'] = os.path.join(os.path.dirname(__file__), 'database', 'tenants')
+
+# Attachment storage
+app.config['ATTACHMENT_STORE'] = os.path.join(os.path.dirname(__file__), 'database', 'attachments')
+app.config['ATTACHMENT_QUOTA_BYTES'] = 100 * 1024 * 1024  # per ticket
+
+# Slow query log; set SMARTSUPPORT_SLOW_QUERY_MS to change the threshold
+app.config['SLOW_QUERY_THRESHOLD_MS'] = float(os.environ.get('SMARTSUPPORT_SLOW_QUERY_MS', 200))
+app.config['SLOW_QUERY_LOG_PATH'] = os.path.join(os.path.dirname(__file__), 'database', 'logs', 'slow_queries.log')
+app.config['SLOW_QUERY_RING_SIZE'] = 200
+
+# Test mode, see src/testing.py
+if os.environ.get('SMARTSUPPORT_TESTING'):
+    test_dir = tempfile.mkdtemp(prefix='smartsupport-test-')
+    app.config['TESTING'] = True
+    app.config['ADMISSION_ENABLED'] = False
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1'
+    app.config['ATTACHMENT_STORE'] = os.path.join(test_dir, 'attachments')
+    app.config['TENANT_DATABASE_DIR'] = os.path.join(test_dir, 'tenants')
+    app.config['SLOW_QUERY_LOG_PATH'] = os.path.join(test_dir, 'logs', 'slow_queries.log')
+
 db.init_app(app)
+init_slow_query_log(app)
 
-def init_default_data():
+def init_default_data(include_demo_users=True):
     """Initialize default data for the application"""
     # Create default ticket statuses
     default_statuses = [
@@ -72,6 +124,10 @@ def init_default_data():
         })
         db.session.add(sla_policy)
     
+    if not include_demo_users:
+        db.session.commit()
+        return
+    
     # Create default admin user
     if not User.query.filter_by(email='admin@smartsupport.com').first():
         admin_user = User(
@@ -104,9 +160,278 @@ def init_default_data():
     
     db.session.commit()
 
+def list_tenants():
+    tenant_dir = app.config['TENANT_DATABASE_DIR']
+    tenants = [DEFAULT_TENANT]
+    if os.path.isdir(tenant_dir):
+        tenants += sorted(name[:-3] for name in os.listdir(tenant_dir) if name.endswith('.db'))
+    return tenants
+
+def create_tenant_schema(tenant):
+    engine = db.engine if tenant == DEFAULT_TENANT else get_tenant_engine(app, tenant)
+    db.metadata.create_all(bind=engine)
+    # create_all only creates indexes together with their table, so indexes
+    # added to existing tables are created here. IF NOT EXISTS rather than
+    # checkfirst, which cannot see expression indexes on SQLite.
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+def migrate_tenant(tenant):
+    """Create missing tables and default rows in one tenant database"""
+    with app.app_context():
+        g.tenant = tenant
+        create_tenant_schema(tenant)
+        init_default_data(include_demo_users=tenant == DEFAULT_TENANT)
+
+# Bring every tenant up to the current schema before serving requests
+for tenant_name in list_tenants():
+    migrate_tenant(tenant_name)
+
 with app.app_context():
-    db.create_all()
-    init_default_data()
+    rebuild_index()
+    rebuild_user_index()
+
+def copy_sqlite(source_path, dest_path):
+    # The backup API gives a consistent copy even while the source is in use
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+
+def select_cli_tenant(tenant):
+    if not tenant_exists(app, tenant):
+        raise click.BadParameter(f'Unknown tenant {tenant}', param_hint='--tenant')
+    g.tenant = tenant
+
+@app.cli.command('tenant-create')
+@click.argument('tenant')
+@click.option('--admin-email', required=True)
+@click.option('--admin-name', default='Administrator', show_default=True)
+@click.option('--admin-password', prompt=True, hide_input=True, confirmation_prompt=True)
+def tenant_create_command(tenant, admin_email, admin_name, admin_password):
+    """Provision a new organization database with an admin account"""
+    if not is_valid_tenant(tenant) or tenant == DEFAULT_TENANT:
+        raise click.BadParameter('Use lowercase letters, digits, - and _', param_hint='TENANT')
+    if tenant_exists(app, tenant):
+        raise click.ClickException(f'Tenant {tenant} already exists')
+    
+    os.makedirs(app.config['TENANT_DATABASE_DIR'], exist_ok=True)
+    g.tenant = tenant
+    create_tenant_schema(tenant)
+    init_default_data(include_demo_users=False)
+    
+    admin_user = User(name=admin_name, email=admin_email, role='Admin')
+    admin_user.set_password(admin_password)
+    db.session.add(admin_user)
+    db.session.commit()
+    click.echo(f'Created tenant {tenant} at {tenant_db_path(app, tenant)}')
+
+@app.cli.command('tenant-migrate')
+@click.option('--tenant', help='Only migrate this tenant')
+def tenant_migrate_command(tenant):
+    """Create any missing tables in every tenant database"""
+    tenants = [tenant] if tenant else list_tenants()
+    for name in tenants:
+        if not tenant_exists(app, name):
+            raise click.ClickException(f'Unknown tenant {name}')
+        migrate_tenant(name)
+        click.echo(f'Migrated {name}')
+
+@app.cli.command('tenant-list')
+def tenant_list_command():
+    """List the organizations hosted on this node"""
+    for tenant in list_tenants():
+        click.echo(tenant)
+
+def count_attachment_contents(database_path):
+    connection = sqlite3.connect(database_path)
+    try:
+        return connection.execute('SELECT COUNT(*) FROM attachment_content').fetchone()[0]
+    except sqlite3.OperationalError:
+        # Exported before attachments were stored in the database
+        return 0
+    finally:
+        connection.close()
+
+@app.cli.command('tenant-export')
+@click.argument('tenant')
+@click.argument('dest', type=click.Path(dir_okay=False, writable=True))
+def tenant_export_command(tenant, dest):
+    """Copy a tenant database to DEST and its attachments to DEST.attachments.tar"""
+    if tenant == DEFAULT_TENANT or not tenant_exists(app, tenant):
+        raise click.ClickException(f'Unknown tenant {tenant}')
+    g.tenant = tenant
+    copy_sqlite(tenant_db_path(app, tenant), dest)
+    archive = archive_path_for(dest)
+    blobs = export_blobs(archive)
+    click.echo(f'Exported {tenant} to {dest} and {blobs} attachment blobs to {archive}')
+
+@app.cli.command('tenant-import')
+@click.argument('tenant')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+def tenant_import_command(tenant, source):
+    """Install a tenant database, and its attachments, exported from another node"""
+    if not is_valid_tenant(tenant) or tenant == DEFAULT_TENANT:
+        raise click.BadParameter('Use lowercase letters, digits, - and _', param_hint='TENANT')
+    if tenant_exists(app, tenant):
+        raise click.ClickException(f'Tenant {tenant} already exists')
+    archive = archive_path_for(source)
+    has_archive = os.path.exists(archive)
+    if not has_archive and count_attachment_contents(source):
+        raise click.ClickException(f'{archive} is missing; the tenant has attachments')
+    
+    g.tenant = tenant
+    blobs = 0
+    if has_archive:
+        # Blobs first, so the tenant never exists with attachments it cannot serve
+        try:
+            blobs = import_blobs(archive)
+        except (tarfile.TarError, ValueError) as exc:
+            raise click.ClickException(f'Cannot import {archive}: {exc}')
+    os.makedirs(app.config['TENANT_DATABASE_DIR'], exist_ok=True)
+    copy_sqlite(source, tenant_db_path(app, tenant))
+    with app.app_context():
+        g.tenant = tenant
+        create_tenant_schema(tenant)
+    click.echo(f'Imported {tenant} with {blobs} attachment blobs')
+
+@app.cli.command('backfill-rollups')
+@click.option('--batch-size', default=500, show_default=True, help='Tickets processed per commit')
+@click.option('--tenant', default=DEFAULT_TENANT, show_default=True)
+def backfill_rollups_command(batch_size, tenant):
+    """Add existing tickets missing from the daily reporting rollups"""
+    select_cli_tenant(tenant)
+    # Safe to rerun from the start: tickets already counted are skipped
+    checkpoint = run_backfill('ticket-rollups', batch_size=batch_size, restart=True)
+    click.echo(f'Backfilled rollups for {checkpoint.rows_processed} tickets')
+
+@app.cli.command('import-email')
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--batch-size', default=500, show_default=True, help='Messages written per commit')
+@click.option('--create-users/--no-create-users', default=True, show_default=True,
+              help='Create End-User accounts for unknown senders instead of skipping them')
+@click.option('--tenant', default=DEFAULT_TENANT, show_default=True)
+def import_email_command(path, batch_size, create_users, tenant):
+    """Import an mbox file or Maildir directory as tickets and comments"""
+    select_cli_tenant(tenant)
+    started = time.monotonic()
+
+    def report(stats):
+        rate = stats['messages'] / max(time.monotonic() - started, 0.001)
+        click.echo(f"{stats['messages']} messages, {stats['tickets']} tickets, "
+                   f"{stats['comments']} comments, {stats['skipped']} skipped ({rate:.0f}/s)")
+
+    stats = import_mailbox(path, batch_size=batch_size, create_users=create_users, progress=report)
+    click.echo(f"Imported {stats['tickets']} tickets and {stats['comments']} comments, "
+               f"created {stats['users_created']} users")
+    # Servers rebuild their duplicate and user search indexes on startup
+    click.echo('Restart the web server to include the imported tickets in search indexes')
+
+@app.cli.group('backfill')
+def backfill_group():
+    """Run online data migrations in small resumable batches"""
+
+@backfill_group.command('list')
+@click.option('--tenant', default=DEFAULT_TENANT, show_default=True)
+def backfill_list_command(tenant):
+    """Show registered backfills and their checkpoints"""
+    select_cli_tenant(tenant)
+    for status in backfill_status():
+        checkpoint = status['checkpoint']
+        if not checkpoint:
+            state = 'not started'
+        elif checkpoint['completed_at']:
+            state = f"completed at {checkpoint['completed_at']}"
+        else:
+            state = f"in progress, {checkpoint['rows_processed']} rows done, last id {checkpoint['last_id']}"
+        click.echo(f"{status['name']}: {state} - {status['description']}")
+
+@backfill_group.command('run')
+@click.argument('name', type=click.Choice(sorted(BACKFILLS)))
+@click.option('--batch-size', default=500, show_default=True, help='Rows per transaction')
+@click.option('--throttle', default=0.05, show_default=True, help='Seconds to pause between batches')
+@click.option('--max-batches', type=int, help='Stop after this many batches')
+@click.option('--restart', is_flag=True, help='Ignore the saved checkpoint and start over')
+@click.option('--tenant', default=DEFAULT_TENANT, show_default=True)
+def backfill_run_command(name, batch_size, throttle, max_batches, restart, tenant):
+    """Run or resume a backfill from its checkpoint"""
+    select_cli_tenant(tenant)
+    started = time.monotonic()
+    
+    def report(checkpoint, done, pending):
+        percent = 100.0 * done / pending if pending else 100.0
+        rate = done / max(time.monotonic() - started, 1e-6)
+        click.echo(f'{name}: {done}/{pending} rows ({percent:.1f}%), {rate:.0f} rows/s, last id {checkpoint.last_id}')
+    
+    checkpoint = run_backfill(
+        name,
+        batch_size=batch_size,
+        throttle=throttle,
+        max_batches=max_batches,
+        restart=restart,
+        progress=report
+    )
+    if checkpoint.completed_at:
+        click.echo(f'{name}: completed, {checkpoint.rows_processed} rows processed')
+    else:
+        click.echo(f'{name}: paused at id {checkpoint.last_id}; run again to resume')
+    if checkpoint.rows_skipped:
+        click.echo(f'{name}: {checkpoint.rows_skipped} rows skipped, see the log for their ids')
+
+@app.cli.group('jobs')
+def jobs_group():
+    """Background job queue stored in the app database"""
+
+def run_worker(tenant, batch_size, poll_interval, once):
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    with app.app_context():
+        g.tenant = tenant
+        # Never share pooled connections inherited from the parent process
+        db.engine.dispose(close=False)
+        for engine in app.extensions.get('tenant_engines', {}).values():
+            engine.dispose(close=False)
+        return work(batch_size=batch_size, poll_interval=poll_interval, once=once, should_stop=lambda: stopping)
+
+@jobs_group.command('work')
+@click.option('--processes', default=1, show_default=True, help='Worker processes to run')
+@click.option('--batch-size', default=10, show_default=True, help='Jobs claimed per round trip')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds to wait when the queue is empty')
+@click.option('--once', is_flag=True, help='Exit once no jobs are due')
+@click.option('--tenant', default=DEFAULT_TENANT, show_default=True)
+def jobs_work_command(processes, batch_size, poll_interval, once, tenant):
+    """Claim and run queued jobs"""
+    select_cli_tenant(tenant)
+    if processes == 1:
+        processed = run_worker(tenant, batch_size, poll_interval, once)
+        click.echo(f'Processed {processed} jobs')
+        return
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(tenant, batch_size, poll_interval, once))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+@jobs_group.command('status')
+@click.option('--tenant', default=DEFAULT_TENANT, show_default=True)
+def jobs_status_command(tenant):
+    """Show job counts by status"""
+    select_cli_tenant(tenant)
+    counts = queue_counts()
+    for status in ['queued', 'running', 'done', 'failed']:
+        click.echo(f'{status}: {counts.get(status, 0)}')
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
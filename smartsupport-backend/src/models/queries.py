@@ -0,0 +1,82 @@
+from sqlalchemy import func, lambda_stmt, select
+from src.models.user import db, Comment, Ticket, User
+
+# Hot request-path queries. Statements are built once (or as lambda
+# statements whose SQL is cached after the first call), so each request
+# only binds parameters instead of rebuilding and recompiling the query.
+
+STAFF_ROLES = ('Agent', 'L1', 'L2', 'L3')
+PRIORITIES = ('Low', 'Medium', 'High', 'Critical')
+
+def get_user(user_id):
+    """Identity-map lookup first; the load statement is cached by SQLAlchemy"""
+    return db.session.get(User, user_id)
+
+def _visible_to(stmt, user):
+    """Restrict a ticket statement to what the user may see"""
+    user_id = user.id
+    if user.role == 'End-User':
+        stmt += lambda s: s.where(Ticket.created_by == user_id)
+    elif user.role in STAFF_ROLES:
+        stmt += lambda s: s.where((Ticket.assigned_to == user_id) | (Ticket.assigned_to.is_(None)))
+    return stmt
+
+def _filtered(stmt, status=None, priority=None, category_id=None):
+    if status:
+        stmt += lambda s: s.where(Ticket.status == status)
+    if priority:
+        stmt += lambda s: s.where(Ticket.priority == priority)
+    if category_id:
+        stmt += lambda s: s.where(Ticket.category_id == category_id)
+    return stmt
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+def page_args(page, per_page):
+    """Clamp page arguments like paginate(error_out=False), with an upper bound"""
+    if page is None or page < 1:
+        page = 1
+    if per_page is None or per_page < 1:
+        per_page = DEFAULT_PER_PAGE
+    return page, min(per_page, MAX_PER_PAGE)
+
+def page_tickets(user, page, per_page, status=None, priority=None, category_id=None):
+    """Return (tickets, total, page, per_page) for one page of the user's ticket list.
+
+    page and per_page are clamped with page_args; the clamped values are
+    returned so callers can echo them.
+    """
+    page, per_page = page_args(page, per_page)
+    offset = (page - 1) * per_page
+
+    count = _filtered(_visible_to(lambda_stmt(lambda: select(func.count(Ticket.id))), user),
+                      status, priority, category_id)
+    total = db.session.execute(count).scalar()
+
+    rows = _filtered(_visible_to(lambda_stmt(lambda: select(Ticket)), user), status, priority, category_id)
+    rows += lambda s: s.order_by(Ticket.created_at.desc()).limit(per_page).offset(offset)
+    tickets = db.session.execute(rows).scalars().all()
+    return tickets, total, page, per_page
+
+def ticket_counts(user):
+    """Return (total, counts by status id, counts by priority) in two grouped queries"""
+    by_status = _visible_to(lambda_stmt(lambda: select(Ticket.status, func.count(Ticket.id))), user)
+    by_status += lambda s: s.group_by(Ticket.status)
+    status_counts = dict(db.session.execute(by_status).all())
+
+    by_priority = _visible_to(lambda_stmt(lambda: select(Ticket.priority, func.count(Ticket.id))), user)
+    by_priority += lambda s: s.group_by(Ticket.priority)
+    priority_counts = dict(db.session.execute(by_priority).all())
+
+    return sum(status_counts.values()), status_counts, priority_counts
+
+_COMMENTS_FOR_TICKET = select(Comment).where(
+    Comment.ticket_id == db.bindparam('ticket_id')
+).order_by(Comment.created_at.asc())
+
+_PUBLIC_COMMENTS_FOR_TICKET = _COMMENTS_FOR_TICKET.where(Comment.is_internal.isnot(True))
+
+def ticket_comments(ticket_id, include_internal=True):
+    stmt = _COMMENTS_FOR_TICKET if include_internal else _PUBLIC_COMMENTS_FOR_TICKET
+    return db.session.execute(stmt, {'ticket_id': ticket_id}).scalars().all()
@@ -1,9 +1,11 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
+from src.services.tenants import TenantSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': TenantSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -20,8 +22,17 @@ class User(db.Model):
     comments = db.relationship('Comment', backref='author', lazy='dynamic')
     notifications = db.relationship('Notification', backref='recipient', lazy='dynamic')
 
+    __table_args__ = (
+        # Email import matches senders on lower(email)
+        db.Index('ix_user_email_lower', db.func.lower(email)),
+    )
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        options = {}
+        # Tests configure a cheap hash so seeding users stays fast
+        if has_app_context() and current_app.config.get('PASSWORD_HASH_METHOD'):
+            options['method'] = current_app.config['PASSWORD_HASH_METHOD']
+        self.password_hash = generate_password_hash(password, **options)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -168,7 +179,25 @@ class Attachment(db.Model):
             'file_name': self.file_name,
             'file_url': self.file_url,
             'uploaded_by': self.uploader.to_dict() if self.uploader else None,
-            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None
+            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
+            'size': self.content.size if self.content else None,
+            'content_type': self.content.content_type if self.content else None
+        }
+
+class AttachmentContent(db.Model):
+    attachment_id = db.Column(db.Integer, db.ForeignKey('attachment.id'), primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(255))
+    
+    # Relationships
+    attachment = db.relationship('Attachment', backref=db.backref('content', uselist=False, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'size': self.size,
+            'content_type': self.content_type
         }
 
 class Log(db.Model):
@@ -190,6 +219,76 @@ class Log(db.Model):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
         }
 
+class AuditEvent(db.Model):
+    # Event codes
+    TICKET_CREATED = 1
+    FIELD_CHANGED = 2
+    COMMENT_ADDED = 3
+    INTERNAL_COMMENT_ADDED = 4
+    ATTACHMENT_ADDED = 5
+    EVENT_NAMES = {
+        TICKET_CREATED: 'ticket_created',
+        FIELD_CHANGED: 'field_changed',
+        COMMENT_ADDED: 'comment_added',
+        INTERNAL_COMMENT_ADDED: 'internal_comment_added',
+        ATTACHMENT_ADDED: 'attachment_added'
+    }
+    
+    # Field codes; values are ids (status, user, category, attachment) or
+    # priority codes, and free-text fields record only that they changed
+    SUBJECT = 1
+    DESCRIPTION = 2
+    PRIORITY = 3
+    STATUS = 4
+    ASSIGNEE = 5
+    CATEGORY = 6
+    FIELD_NAMES = {
+        SUBJECT: 'subject',
+        DESCRIPTION: 'description',
+        PRIORITY: 'priority',
+        STATUS: 'status',
+        ASSIGNEE: 'assigned_to',
+        CATEGORY: 'category_id'
+    }
+    
+    PRIORITY_CODES = {'Low': 1, 'Medium': 2, 'High': 3, 'Critical': 4}
+    PRIORITY_NAMES = {code: name for name, code in PRIORITY_CODES.items()}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    event = db.Column(db.SmallInteger, nullable=False)
+    field = db.Column(db.SmallInteger)
+    old_value = db.Column(db.Integer)
+    new_value = db.Column(db.Integer)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    legacy_log_id = db.Column(db.Integer, db.ForeignKey('log.id'), unique=True)  # set when converted from a Log row
+    
+    __table_args__ = (
+        db.Index('ix_audit_event_ticket_time', 'ticket_id', 'timestamp'),
+        db.Index('ix_audit_event_actor_time', 'actor_id', 'timestamp'),
+    )
+    
+    # Relationships
+    ticket = db.relationship('Ticket', backref=db.backref('audit_events', lazy='dynamic', cascade='all, delete-orphan'))
+
+    def _decode(self, value):
+        if self.field == self.PRIORITY and value is not None:
+            return self.PRIORITY_NAMES.get(value)
+        return value
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'ticket_id': self.ticket_id,
+            'actor_id': self.actor_id,
+            'event': self.EVENT_NAMES.get(self.event),
+            'field': self.FIELD_NAMES.get(self.field),
+            'old_value': self._decode(self.old_value),
+            'new_value': self._decode(self.new_value),
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+        }
+
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -208,3 +307,129 @@ class Notification(db.Model):
             'sent_at': self.sent_at.isoformat() if self.sent_at else None
         }
 
+
+class TicketMetrics(db.Model):
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), primary_key=True)
+    first_response_at = db.Column(db.DateTime)
+    resolved_at = db.Column(db.DateTime)
+
+    # Relationships
+    ticket = db.relationship('Ticket', backref=db.backref('metrics', uselist=False, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {
+            'ticket_id': self.ticket_id,
+            'first_response_at': self.first_response_at.isoformat() if self.first_response_at else None,
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None
+        }
+
+class DailyTicketRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
+    priority = db.Column(db.String(50))
+    agent_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    resolved_count = db.Column(db.Integer, nullable=False, default=0)
+    first_response_count = db.Column(db.Integer, nullable=False, default=0)
+    first_response_minutes = db.Column(db.Float, nullable=False, default=0.0)
+    resolution_minutes = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'category_id', 'priority', 'agent_id', name='uq_daily_rollup_bucket'),
+    )
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'category_id': self.category_id,
+            'priority': self.priority,
+            'agent_id': self.agent_id,
+            'created_count': self.created_count,
+            'resolved_count': self.resolved_count,
+            'first_response_count': self.first_response_count,
+            'first_response_minutes': self.first_response_minutes,
+            'resolution_minutes': self.resolution_minutes
+        }
+
+class BackfillCheckpoint(db.Model):
+    name = db.Column(db.String(100), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_skipped = db.Column(db.Integer, nullable=False, default=0)  # left unchanged, see the log
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'last_id': self.last_id,
+            'rows_processed': self.rows_processed,
+            'rows_skipped': self.rows_skipped,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text)  # JSON string
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    interval_seconds = db.Column(db.Integer)  # set for recurring jobs
+    claim_token = db.Column(db.String(32), index=True)
+    locked_at = db.Column(db.DateTime)
+    lease_expires_at = db.Column(db.DateTime)  # claimable again after this
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    def get_payload(self):
+        if self.payload:
+            return json.loads(self.payload)
+        return {}
+
+    def set_payload(self, payload_dict):
+        self.payload = json.dumps(payload_dict)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'task': self.task,
+            'payload': self.get_payload(),
+            'status': self.status,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'interval_seconds': self.interval_seconds,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class InboundMessage(db.Model):
+    """An imported email, keyed by Message-ID for threading and re-runs"""
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.String(998), unique=True, nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False, index=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey('comment.id'))  # set for replies
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'message_id': self.message_id,
+            'ticket_id': self.ticket_id,
+            'comment_id': self.comment_id,
+            'sender_id': self.sender_id,
+            'received_at': self.received_at.isoformat() if self.received_at else None
+        }
@@ -1,6 +1,9 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, TicketStatus, Category, SLAPolicy
+import base64
+from datetime import datetime
+from flask import Blueprint, request, jsonify, session, current_app
+from src.models.user import db, User, TicketStatus, Category, SLAPolicy, AuditEvent
 from src.routes.auth import login_required, role_required
+from src.services.user_index import get_user_index
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -41,6 +44,7 @@ def update_user(user_id):
         user.role = data['role']
     
     db.session.commit()
+    get_user_index().upsert(user)
     
     return jsonify({
         'message': 'User updated successfully',
@@ -58,9 +62,28 @@ def delete_user(user_id):
     
     db.session.delete(user)
     db.session.commit()
+    get_user_index().remove(user_id)
     
     return jsonify({'message': 'User deleted successfully'}), 200
 
+@admin_bp.route('/users/search', methods=['GET'])
+@role_required(['Admin', 'Agent', 'L1', 'L2', 'L3'])
+def search_users():
+    query = request.args.get('q', '').strip()
+    roles = request.args.get('role')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    
+    if not query:
+        return jsonify({'users': []}), 200
+    
+    users = get_user_index().search(
+        query,
+        roles=set(roles.split(',')) if roles else None,
+        limit=limit
+    )
+    
+    return jsonify({'users': users}), 200
+
 # Ticket Status Management
 @admin_bp.route('/ticket-statuses', methods=['GET'])
 @login_required
@@ -253,3 +276,83 @@ def update_sla_policy(policy_id):
         'policy': policy.to_dict()
     }), 200
 
+# Audit Log
+def _encode_cursor(audit_event):
+    raw = f'{audit_event.timestamp.isoformat()}|{audit_event.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    timestamp, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(timestamp), int(event_id)
+
+@admin_bp.route('/audit', methods=['GET'])
+@role_required(['Admin'])
+def get_audit_events():
+    ticket_id = request.args.get('ticket_id', type=int)
+    actor_id = request.args.get('actor_id', type=int)
+    event = request.args.get('event')
+    field = request.args.get('field')
+    cursor = request.args.get('cursor')
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    
+    query = AuditEvent.query
+    
+    # Filters line up with the (ticket_id, timestamp) and (actor_id, timestamp) indexes
+    if ticket_id is not None:
+        query = query.filter(AuditEvent.ticket_id == ticket_id)
+    if actor_id is not None:
+        query = query.filter(AuditEvent.actor_id == actor_id)
+    if event:
+        codes = [code for code, name in AuditEvent.EVENT_NAMES.items() if name == event]
+        if not codes:
+            return jsonify({'error': 'Unknown event'}), 400
+        query = query.filter(AuditEvent.event == codes[0])
+    if field:
+        codes = [code for code, name in AuditEvent.FIELD_NAMES.items() if name == field]
+        if not codes:
+            return jsonify({'error': 'Unknown field'}), 400
+        query = query.filter(AuditEvent.field == codes[0])
+    
+    if cursor:
+        try:
+            timestamp, event_id = _decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(
+            (AuditEvent.timestamp < timestamp) |
+            ((AuditEvent.timestamp == timestamp) & (AuditEvent.id < event_id))
+        )
+    
+    events = query.order_by(AuditEvent.timestamp.desc(), AuditEvent.id.desc()).limit(limit + 1).all()
+    has_more = len(events) > limit
+    events = events[:limit]
+    
+    return jsonify({
+        'events': [audit_event.to_dict() for audit_event in events],
+        'next_cursor': _encode_cursor(events[-1]) if has_more else None
+    }), 200
+
+# Operational metrics
+@admin_bp.route('/admission-stats', methods=['GET'])
+@role_required(['Admin'])
+def get_admission_stats():
+    return jsonify(current_app.extensions['admission'].stats()), 200
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@role_required(['Admin'])
+def get_slow_queries():
+    slow_queries = current_app.extensions['slow_queries']
+    limit = max(1, min(request.args.get('limit', 50, type=int), slow_queries.ring.maxlen))
+    scans_only = request.args.get('full_scan', 'false').lower() == 'true'
+    
+    return jsonify({
+        'threshold_ms': slow_queries.threshold_ms,
+        'total': slow_queries.total,
+        'queries': slow_queries.recent(limit=limit, scans_only=scans_only)
+    }), 200
+
+@admin_bp.route('/slow-queries', methods=['DELETE'])
+@role_required(['Admin'])
+def clear_slow_queries():
+    current_app.extensions['slow_queries'].clear()
+    return jsonify({'message': 'Slow query log cleared'}), 200
@@ -1,9 +1,14 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app, g
 from src.models.user import db, User
+from src.models.queries import get_user
+from src.services.user_index import get_user_index
+from src.services.tenants import DEFAULT_TENANT, current_tenant, tenant_exists
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
 
+VALID_ROLES = ['Admin', 'Agent', 'End-User', 'L1', 'L2', 'L3']
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -19,7 +24,7 @@ def role_required(roles):
             if 'user_id' not in session:
                 return jsonify({'error': 'Authentication required'}), 401
             
-            user = User.query.get(session['user_id'])
+            user = get_user(session['user_id'])
             if not user or user.role not in roles:
                 return jsonify({'error': 'Insufficient permissions'}), 403
             return f(*args, **kwargs)
@@ -31,12 +36,20 @@ def login():
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
+    organization = data.get('organization') or DEFAULT_TENANT
     
     if not email or not password:
         return jsonify({'error': 'Email and password required'}), 400
     
+    if not tenant_exists(current_app, organization):
+        return jsonify({'error': 'Invalid credentials'}), 401
+    
+    # Users live in their organization's database
+    g.tenant = organization
     user = User.query.filter_by(email=email).first()
     if user and user.check_password(password):
+        session.clear()
+        session['tenant'] = organization
         session['user_id'] = user.id
         session['user_role'] = user.role
         return jsonify({
@@ -57,11 +70,31 @@ def register():
     name = data.get('name')
     email = data.get('email')
     password = data.get('password')
-    role = data.get('role', 'End-User')
+    organization = data.get('organization')
     
     if not all([name, email, password]):
         return jsonify({'error': 'Name, email, and password required'}), 400
     
+    # Admins add users, with any role, to their own organization only;
+    # everyone else can only sign themselves up as an end user
+    caller = get_user(session['user_id']) if 'user_id' in session else None
+    if caller and caller.role == 'Admin':
+        role = data.get('role', 'End-User')
+        if role not in VALID_ROLES:
+            return jsonify({'error': 'Invalid role'}), 400
+        if organization and organization != current_tenant():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        organization = current_tenant()
+    else:
+        role = 'End-User'
+        if organization and organization != DEFAULT_TENANT:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        organization = DEFAULT_TENANT
+    
+    if not tenant_exists(current_app, organization):
+        return jsonify({'error': 'Unknown organization'}), 400
+    g.tenant = organization
+    
     if User.query.filter_by(email=email).first():
         return jsonify({'error': 'Email already registered'}), 400
     
@@ -70,6 +103,7 @@ def register():
     
     db.session.add(user)
     db.session.commit()
+    get_user_index().upsert(user)
     
     return jsonify({
         'message': 'User registered successfully',
@@ -79,6 +113,6 @@ def register():
 @auth_bp.route('/me', methods=['GET'])
 @login_required
 def get_current_user():
-    user = User.query.get(session['user_id'])
+    user = get_user(session['user_id'])
     return jsonify({'user': user.to_dict()}), 200
 
@@ -0,0 +1,81 @@
+from flask import Blueprint, request, jsonify, session, current_app
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from src.models.user import db
+from src.routes.auth import login_required
+from src.services.admission import admit_sub_request
+
+batch_bp = Blueprint('batch', __name__)
+
+MAX_SUB_REQUESTS = 10
+
+def _run_sub_request(app, path, query_string):
+    builder = EnvironBuilder(
+        path=path,
+        method='GET',
+        query_string=query_string,
+        base_url=request.host_url
+    )
+    ctx = app.request_context(builder.get_environ())
+    # Reuse the already decoded session; the app context (and with it the
+    # database session) is shared because it is still the active one
+    ctx.session = session._get_current_object()
+    ctx.push()
+    try:
+        # Only API blueprints can be batched, not the static file fallback
+        if ctx.request.routing_exception is None and ctx.request.blueprint is None:
+            return {'status': 404, 'body': {'error': 'Not found'}}
+        if ctx.request.routing_exception is None:
+            rejected = admit_sub_request(ctx.request.endpoint, ctx.request.method)
+            if rejected:
+                reason, retry_after = rejected
+                return {'status': 429, 'body': {'error': 'Too many requests', 'reason': reason, 'retry_after': retry_after}}
+        try:
+            response = app.make_response(app.dispatch_request())
+        except HTTPException as e:
+            return {'status': e.code, 'body': {'error': e.description}}
+        except Exception:
+            # One failing sub-request must not take the others down with it
+            app.logger.exception('Batch sub-request %s failed', path)
+            db.session.rollback()
+            return {'status': 500, 'body': {'error': 'Internal server error'}}
+        return {'status': response.status_code, 'body': response.get_json(silent=True)}
+    finally:
+        ctx.pop()
+        builder.close()
+
+@batch_bp.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    data = request.get_json()
+    sub_requests = data.get('requests') if data else None
+
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(sub_requests) > MAX_SUB_REQUESTS:
+        return jsonify({'error': f'At most {MAX_SUB_REQUESTS} requests per batch'}), 400
+
+    app = current_app._get_current_object()
+    responses = []
+    for sub_request in sub_requests:
+        if not isinstance(sub_request, dict):
+            responses.append({'status': 400, 'body': {'error': 'Each request must be an object'}})
+            continue
+        path = sub_request.get('path', '')
+        method = sub_request.get('method', 'GET')
+        if not isinstance(path, str) or not isinstance(method, str):
+            responses.append({'status': 400, 'body': {'error': 'path and method must be strings'}})
+            continue
+        method = method.upper()
+
+        if not path.startswith('/api/') or path.split('?')[0].rstrip('/') == '/api/batch':
+            responses.append({'status': 400, 'body': {'error': 'Invalid path'}})
+            continue
+        if method != 'GET':
+            responses.append({'status': 405, 'body': {'error': 'Only GET requests can be batched'}})
+            continue
+
+        path, _, query_string = path.partition('?')
+        responses.append(_run_sub_request(app, path, query_string))
+
+    return jsonify({'responses': responses}), 200
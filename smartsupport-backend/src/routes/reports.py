@@ -0,0 +1,72 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import db, DailyTicketRollup
+from src.routes.auth import role_required
+from datetime import datetime, timedelta
+
+reports_bp = Blueprint('reports', __name__)
+
+GROUP_COLUMNS = {
+    'category': DailyTicketRollup.category_id,
+    'priority': DailyTicketRollup.priority,
+    'agent': DailyTicketRollup.agent_id
+}
+
+def _parse_day(value, default):
+    if not value:
+        return default
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _mean(total, count):
+    return round(total / count, 2) if count else None
+
+@reports_bp.route('/daily', methods=['GET'])
+@role_required(['Admin'])
+def get_daily_report():
+    today = datetime.utcnow().date()
+    try:
+        end = _parse_day(request.args.get('end'), today)
+        start = _parse_day(request.args.get('start'), end - timedelta(days=29))
+    except ValueError:
+        return jsonify({'error': 'Dates must be formatted as YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'error': 'Start date must not be after end date'}), 400
+
+    group_by = request.args.get('group_by', 'category')
+    if group_by not in GROUP_COLUMNS:
+        return jsonify({'error': f'group_by must be one of {", ".join(GROUP_COLUMNS)}'}), 400
+    group_column = GROUP_COLUMNS[group_by]
+
+    in_range = DailyTicketRollup.day.between(start, end)
+    totals = [
+        db.func.sum(DailyTicketRollup.created_count),
+        db.func.sum(DailyTicketRollup.resolved_count),
+        db.func.sum(DailyTicketRollup.first_response_count),
+        db.func.sum(DailyTicketRollup.first_response_minutes),
+        db.func.sum(DailyTicketRollup.resolution_minutes)
+    ]
+
+    daily_rows = db.session.query(DailyTicketRollup.day, *totals[:2]).filter(in_range) \
+        .group_by(DailyTicketRollup.day).order_by(DailyTicketRollup.day).all()
+
+    group_rows = db.session.query(group_column, *totals).filter(in_range) \
+        .group_by(group_column).all()
+
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'daily': [
+            {'date': day.isoformat(), 'created': created or 0, 'resolved': resolved or 0}
+            for day, created, resolved in daily_rows
+        ],
+        'breakdown': [
+            {
+                'key': key,
+                'created': created or 0,
+                'resolved': resolved or 0,
+                'mean_first_response_minutes': _mean(response_minutes or 0, responses or 0),
+                'mean_resolution_minutes': _mean(resolution_minutes or 0, resolved or 0)
+            }
+            for key, created, resolved, responses, response_minutes, resolution_minutes in group_rows
+        ]
+    }), 200
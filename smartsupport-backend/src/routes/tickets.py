@@ -1,6 +1,14 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.user import db, Ticket, User, TicketStatus, Category, SLAPolicy, Comment, Log
+import math
+import os
+from flask import Blueprint, request, jsonify, session, current_app, send_file, url_for
+from werkzeug.utils import secure_filename
+from src.models.user import db, Ticket, TicketStatus, Category, SLAPolicy, Comment, Attachment, AttachmentContent, AuditEvent
+from src.models.queries import PRIORITIES, get_user, page_tickets, ticket_comments, ticket_counts
 from src.routes.auth import login_required, role_required
+from src.services import audit, rollups, notifications  # notifications registers its job tasks
+from src.services.jobs import enqueue
+from src.services.duplicates import get_duplicate_index, sync_ticket, text_signature
+from src.services.attachments import QuotaExceeded, blob_path, store_stream
 from datetime import datetime
 
 tickets_bp = Blueprint('tickets', __name__)
@@ -8,45 +16,26 @@ tickets_bp = Blueprint('tickets', __name__)
 @tickets_bp.route('/tickets', methods=['GET'])
 @login_required
 def get_tickets():
-    user = User.query.get(session['user_id'])
+    user = get_user(session['user_id'])
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     status_filter = request.args.get('status')
     priority_filter = request.args.get('priority')
     category_filter = request.args.get('category')
     
-    query = Ticket.query
-    
-    # Role-based filtering
-    if user.role == 'End-User':
-        query = query.filter_by(created_by=user.id)
-    elif user.role in ['Agent', 'L1', 'L2', 'L3']:
-        # Agents see tickets assigned to them or unassigned tickets
-        query = query.filter(
-            (Ticket.assigned_to == user.id) | 
-            (Ticket.assigned_to.is_(None))
-        )
-    # Admins see all tickets
-    
-    # Apply filters
-    if status_filter:
-        query = query.filter_by(status=status_filter)
-    if priority_filter:
-        query = query.filter_by(priority=priority_filter)
-    if category_filter:
-        query = query.filter_by(category_id=category_filter)
-    
-    # Order by creation date (newest first)
-    query = query.order_by(Ticket.created_at.desc())
-    
-    tickets = query.paginate(
-        page=page, per_page=per_page, error_out=False
+    # Role-based filtering: end users see their own tickets, agents see
+    # tickets assigned to them or unassigned, admins see all tickets
+    tickets, total, page, per_page = page_tickets(
+        user, page, per_page,
+        status=status_filter,
+        priority=priority_filter,
+        category_id=category_filter
     )
     
     return jsonify({
-        'tickets': [ticket.to_dict() for ticket in tickets.items],
-        'total': tickets.total,
-        'pages': tickets.pages,
+        'tickets': [ticket.to_dict() for ticket in tickets],
+        'total': total,
+        'pages': math.ceil(total / per_page),
         'current_page': page,
         'per_page': per_page
     }), 200
@@ -80,36 +69,56 @@ def create_ticket():
     db.session.add(ticket)
     db.session.commit()
     
-    # Create log entry
-    log = Log(
-        ticket_id=ticket.id,
-        action=f'Ticket created with priority {priority}',
-        actor_id=session['user_id']
+    # Record audit event
+    audit.record_event(
+        ticket.id, session['user_id'], AuditEvent.TICKET_CREATED,
+        field=AuditEvent.PRIORITY, new_value=audit.priority_code(priority)
     )
-    db.session.add(log)
+    rollups.record_ticket_created(ticket)
     db.session.commit()
     
+    # One signature serves both the lookup and indexing the new ticket
+    sig = text_signature(subject, description)
+    possible_duplicates = _find_duplicates(subject, description, exclude_id=ticket.id, sig=sig)
+    sync_ticket(ticket, sig=sig)
+    
     return jsonify({
         'message': 'Ticket created successfully',
-        'ticket': ticket.to_dict()
+        'ticket': ticket.to_dict(),
+        'possible_duplicates': possible_duplicates
     }), 201
 
+def _find_duplicates(subject, description, exclude_id=None, sig=None):
+    # End users only get matched against their own tickets
+    created_by = session['user_id'] if session.get('user_role') == 'End-User' else None
+    return get_duplicate_index().query(subject, description, created_by=created_by, exclude_id=exclude_id, sig=sig)
+
+@tickets_bp.route('/tickets/duplicates', methods=['POST'])
+@login_required
+def check_duplicates():
+    data = request.get_json()
+    subject = data.get('subject')
+    description = data.get('description')
+    
+    if not subject and not description:
+        return jsonify({'error': 'Subject or description is required'}), 400
+    
+    return jsonify({
+        'possible_duplicates': _find_duplicates(subject, description)
+    }), 200
+
 @tickets_bp.route('/tickets/<int:ticket_id>', methods=['GET'])
 @login_required
 def get_ticket(ticket_id):
-    user = User.query.get(session['user_id'])
-    ticket = Ticket.query.get_or_404(ticket_id)
+    user = get_user(session['user_id'])
+    ticket = db.get_or_404(Ticket, ticket_id)
     
     # Check permissions
     if user.role == 'End-User' and ticket.created_by != user.id:
         return jsonify({'error': 'Access denied'}), 403
     
-    # Get comments
-    comments = Comment.query.filter_by(ticket_id=ticket_id).order_by(Comment.created_at.asc()).all()
-    
-    # Filter internal comments for end users
-    if user.role == 'End-User':
-        comments = [c for c in comments if not c.is_internal]
+    # Get comments, without internal ones for end users
+    comments = ticket_comments(ticket_id, include_internal=user.role != 'End-User')
     
     ticket_data = ticket.to_dict()
     ticket_data['comments'] = [comment.to_dict() for comment in comments]
@@ -119,7 +128,7 @@ def get_ticket(ticket_id):
 @tickets_bp.route('/tickets/<int:ticket_id>', methods=['PUT'])
 @login_required
 def update_ticket(ticket_id):
-    user = User.query.get(session['user_id'])
+    user = get_user(session['user_id'])
     ticket = Ticket.query.get_or_404(ticket_id)
     data = request.get_json()
     
@@ -131,48 +140,49 @@ def update_ticket(ticket_id):
     
     # Update fields
     if 'subject' in data and user.role != 'End-User':
-        old_subject = ticket.subject
         ticket.subject = data['subject']
-        changes.append(f'Subject changed from "{old_subject}" to "{ticket.subject}"')
+        changes.append((AuditEvent.SUBJECT, None, None))
     
     if 'description' in data:
         ticket.description = data['description']
-        changes.append('Description updated')
+        changes.append((AuditEvent.DESCRIPTION, None, None))
     
     if 'priority' in data and user.role in ['Admin', 'Agent', 'L1', 'L2', 'L3']:
         old_priority = ticket.priority
         ticket.priority = data['priority']
-        changes.append(f'Priority changed from {old_priority} to {ticket.priority}')
+        changes.append((AuditEvent.PRIORITY, audit.priority_code(old_priority), audit.priority_code(ticket.priority)))
     
     if 'status' in data and user.role in ['Admin', 'Agent', 'L1', 'L2', 'L3']:
-        old_status = ticket.status_obj.name if ticket.status_obj else 'None'
+        old_status_obj = ticket.status_obj
         ticket.status = data['status']
         new_status = TicketStatus.query.get(data['status'])
-        changes.append(f'Status changed from {old_status} to {new_status.name if new_status else "Unknown"}')
+        changes.append((AuditEvent.STATUS, old_status_obj.id if old_status_obj else None, new_status.id if new_status else None))
     
     if 'assigned_to' in data and user.role in ['Admin', 'Agent', 'L1', 'L2', 'L3']:
-        old_assignee = ticket.assignee.name if ticket.assignee else 'Unassigned'
+        old_assignee = ticket.assigned_to
         ticket.assigned_to = data['assigned_to']
-        new_assignee = User.query.get(data['assigned_to']) if data['assigned_to'] else None
-        changes.append(f'Assigned from {old_assignee} to {new_assignee.name if new_assignee else "Unassigned"}')
+        changes.append((AuditEvent.ASSIGNEE, old_assignee, ticket.assigned_to))
+        if ticket.assigned_to and ticket.assigned_to not in (old_assignee, user.id):
+            enqueue('notifications.ticket_assigned', {'ticket_id': ticket.id, 'assignee_id': ticket.assigned_to})
     
     if 'category_id' in data and user.role in ['Admin', 'Agent', 'L1', 'L2', 'L3']:
+        old_category = ticket.category_id
         ticket.category_id = data['category_id']
-        changes.append('Category updated')
+        changes.append((AuditEvent.CATEGORY, old_category, ticket.category_id))
+    
+    # Recorded after every field is applied so a resolution is credited
+    # to the assignee and category set in the same update
+    if 'status' in data and user.role in ['Admin', 'Agent', 'L1', 'L2', 'L3']:
+        rollups.record_status_change(ticket, old_status_obj, new_status)
     
     ticket.updated_at = datetime.utcnow()
-    db.session.commit()
     
-    # Create log entries for changes
-    for change in changes:
-        log = Log(
-            ticket_id=ticket.id,
-            action=change,
-            actor_id=session['user_id']
-        )
-        db.session.add(log)
+    # Record audit events for changes
+    for field, old_value, new_value in changes:
+        audit.record_change(ticket.id, session['user_id'], field, old_value, new_value)
     
     db.session.commit()
+    sync_ticket(ticket)
     
     return jsonify({
         'message': 'Ticket updated successfully',
@@ -183,7 +193,7 @@ def update_ticket(ticket_id):
 @login_required
 def add_comment(ticket_id):
     ticket = Ticket.query.get_or_404(ticket_id)
-    user = User.query.get(session['user_id'])
+    user = get_user(session['user_id'])
     data = request.get_json()
     
     comment_text = data.get('comment_text')
@@ -208,17 +218,16 @@ def add_comment(ticket_id):
     )
     
     db.session.add(comment)
+    rollups.record_comment(ticket, comment, user)
     
     # Update ticket timestamp
     ticket.updated_at = datetime.utcnow()
     
-    # Create log entry
-    log = Log(
-        ticket_id=ticket.id,
-        action=f'Comment added {"(internal)" if is_internal else ""}',
-        actor_id=session['user_id']
+    # Record audit event
+    audit.record_event(
+        ticket.id, session['user_id'],
+        AuditEvent.INTERNAL_COMMENT_ADDED if is_internal else AuditEvent.COMMENT_ADDED
     )
-    db.session.add(log)
     
     db.session.commit()
     
@@ -227,41 +236,130 @@ def add_comment(ticket_id):
         'comment': comment.to_dict()
     }), 201
 
+@tickets_bp.route('/tickets/<int:ticket_id>/attachments', methods=['GET'])
+@login_required
+def get_attachments(ticket_id):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    user = get_user(session['user_id'])
+    
+    # Check permissions
+    if user.role == 'End-User' and ticket.created_by != user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    attachments = ticket.attachments.order_by(Attachment.uploaded_at.asc()).all()
+    return jsonify({
+        'attachments': [attachment.to_dict() for attachment in attachments]
+    }), 200
+
+def _attachment_bytes(ticket_id):
+    return db.session.query(db.func.coalesce(db.func.sum(AttachmentContent.size), 0)) \
+        .join(Attachment, AttachmentContent.attachment_id == Attachment.id) \
+        .filter(Attachment.ticket_id == ticket_id).scalar()
+
+@tickets_bp.route('/tickets/<int:ticket_id>/attachments', methods=['POST'])
+@login_required
+def upload_attachment(ticket_id):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    user = get_user(session['user_id'])
+    
+    # Check permissions
+    if user.role == 'End-User' and ticket.created_by != user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    # The body is the raw file content; the name comes from the query string
+    file_name = secure_filename(request.args.get('file_name', ''))
+    if not file_name:
+        return jsonify({'error': 'file_name is required'}), 400
+    
+    quota = current_app.config['ATTACHMENT_QUOTA_BYTES']
+    remaining = quota - _attachment_bytes(ticket_id)
+    if request.content_length is not None and request.content_length > remaining:
+        return jsonify({'error': 'Attachment quota exceeded for this ticket'}), 413
+    
+    try:
+        sha256, size = store_stream(request.stream, remaining)
+    except QuotaExceeded:
+        return jsonify({'error': 'Attachment quota exceeded for this ticket'}), 413
+    
+    # Writing the ticket first takes the database write lock, so the total
+    # below cannot change under concurrent uploads until this commits
+    ticket.updated_at = datetime.utcnow()
+    db.session.flush()
+    
+    attachment = Attachment(
+        ticket_id=ticket_id,
+        file_name=file_name,
+        uploaded_by=session['user_id']
+    )
+    attachment.content = AttachmentContent(
+        sha256=sha256,
+        size=size,
+        content_type=request.mimetype or 'application/octet-stream'
+    )
+    db.session.add(attachment)
+    db.session.flush()
+    
+    if _attachment_bytes(ticket_id) > quota:
+        # The blob may already be shared with an upload that has not
+        # committed yet, so it is left for the orphan sweep job
+        db.session.rollback()
+        return jsonify({'error': 'Attachment quota exceeded for this ticket'}), 413
+    
+    attachment.file_url = url_for('tickets.download_attachment', ticket_id=ticket_id, attachment_id=attachment.id)
+    
+    audit.record_event(ticket_id, session['user_id'], AuditEvent.ATTACHMENT_ADDED, new_value=attachment.id)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Attachment uploaded successfully',
+        'attachment': attachment.to_dict()
+    }), 201
+
+@tickets_bp.route('/tickets/<int:ticket_id>/attachments/<int:attachment_id>/download', methods=['GET'])
+@login_required
+def download_attachment(ticket_id, attachment_id):
+    ticket = Ticket.query.get_or_404(ticket_id)
+    user = get_user(session['user_id'])
+    
+    # Check permissions
+    if user.role == 'End-User' and ticket.created_by != user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    attachment = Attachment.query.filter_by(id=attachment_id, ticket_id=ticket_id).first_or_404()
+    if not attachment.content or not os.path.exists(blob_path(attachment.content.sha256)):
+        return jsonify({'error': 'Attachment content not found'}), 404
+    
+    # conditional=True handles Range, If-Range and If-None-Match against the content hash
+    return send_file(
+        blob_path(attachment.content.sha256),
+        mimetype=attachment.content.content_type,
+        as_attachment=True,
+        download_name=attachment.file_name,
+        conditional=True,
+        etag=attachment.content.sha256
+    )
+
 @tickets_bp.route('/tickets/stats', methods=['GET'])
 @login_required
 def get_ticket_stats():
-    user = User.query.get(session['user_id'])
+    user = get_user(session['user_id'])
     
-    base_query = Ticket.query
-    
-    # Role-based filtering
-    if user.role == 'End-User':
-        base_query = base_query.filter_by(created_by=user.id)
-    elif user.role in ['Agent', 'L1', 'L2', 'L3']:
-        base_query = base_query.filter(
-            (Ticket.assigned_to == user.id) | 
-            (Ticket.assigned_to.is_(None))
-        )
+    # Role-based filtering happens inside ticket_counts
+    total_tickets, counts_by_status, counts_by_priority = ticket_counts(user)
     
     # Get status counts
     status_counts = {}
     statuses = TicketStatus.query.all()
     for status in statuses:
-        count = base_query.filter_by(status=status.id).count()
-        status_counts[status.name] = count
+        status_counts[status.name] = counts_by_status.get(status.id, 0)
     
     # Get priority counts
     priority_counts = {}
-    priorities = ['Low', 'Medium', 'High', 'Critical']
-    for priority in priorities:
-        count = base_query.filter_by(priority=priority).count()
-        priority_counts[priority] = count
-    
-    total_tickets = base_query.count()
+    for priority in PRIORITIES:
+        priority_counts[priority] = counts_by_priority.get(priority, 0)
     
     return jsonify({
         'total_tickets': total_tickets,
         'status_counts': status_counts,
         'priority_counts': priority_counts
     }), 200
-
@@ -0,0 +1,162 @@
+import math
+import threading
+import time
+from collections import Counter
+from flask import current_app, request, session, jsonify
+from src.services.tenants import current_tenant
+
+# Endpoints whose cost is dominated by count/aggregate queries
+EXPENSIVE_ENDPOINTS = {
+    'tickets.get_tickets',
+    'tickets.get_ticket_stats',
+    'reports.get_daily_report'
+}
+
+# A batch is admitted as a read; each of its sub-requests is then charged
+# for its own endpoint, see admit_sub_request
+BATCH_ENDPOINTS = {'batch.batch'}
+
+# How often idle buckets are dropped; a bucket idle long enough to refill
+# completely behaves exactly like a missing one
+SWEEP_INTERVAL = 60.0
+
+DEFAULT_RATES = {
+    # cost class: (tokens per second, burst)
+    'expensive': (2.0, 10),
+    'read': (10.0, 40),
+    'write': (5.0, 20)
+}
+
+class AdmissionController:
+    """Token buckets per (client, cost class) plus a global in-flight limit.
+
+    Expensive reads are shed once the workers are mostly busy, plain reads
+    only when they are fully busy, and writes are never shed for
+    saturation so ticket updates keep priority.
+    """
+
+    def __init__(self, max_concurrency=32, expensive_share=0.5, rates=None):
+        self.max_concurrency = max_concurrency
+        self.expensive_limit = max(1, int(max_concurrency * expensive_share))
+        self.rates = rates or DEFAULT_RATES
+        self._lock = threading.Lock()
+        self._buckets = {}  # (client, cost_class) -> [tokens, last_refill]
+        self._last_sweep = time.monotonic()
+        self._in_flight = 0
+        self.shed = Counter()
+
+    def _sweep(self, now):
+        idle = [
+            key for key, (tokens, last) in self._buckets.items()
+            if (now - last) * self.rates[key[1]][0] + tokens >= self.rates[key[1]][1]
+        ]
+        for key in idle:
+            del self._buckets[key]
+        self._last_sweep = now
+
+    def _take_token(self, key, cost_class, now):
+        if now - self._last_sweep >= SWEEP_INTERVAL:
+            self._sweep(now)
+        rate, burst = self.rates[cost_class]
+        tokens, last = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        if tokens < 1:
+            self._buckets[key] = [tokens, now]
+            return math.ceil((1 - tokens) / rate)
+        self._buckets[key] = [tokens - 1, now]
+        return 0
+
+    def admit(self, client, cost_class, hold_slot=True):
+        """Return None if admitted, otherwise (reason, retry_after_seconds).
+
+        hold_slot=False charges a token without taking an in-flight slot,
+        for work run inside a request that already holds one.
+        """
+        with self._lock:
+            others = self._in_flight if hold_slot else self._in_flight - 1
+            if cost_class == 'expensive' and others >= self.expensive_limit:
+                self.shed[(cost_class, 'saturated')] += 1
+                return 'saturated', 1
+            if cost_class == 'read' and others >= self.max_concurrency:
+                self.shed[(cost_class, 'saturated')] += 1
+                return 'saturated', 1
+            retry_after = self._take_token((client, cost_class), cost_class, time.monotonic())
+            if retry_after:
+                self.shed[(cost_class, 'rate_limited')] += 1
+                return 'rate_limited', retry_after
+            if hold_slot:
+                self._in_flight += 1
+            return None
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'buckets': len(self._buckets),
+                'max_concurrency': self.max_concurrency,
+                'expensive_limit': self.expensive_limit,
+                'shed': [
+                    {'cost_class': cost_class, 'reason': reason, 'count': count}
+                    for (cost_class, reason), count in sorted(self.shed.items())
+                ]
+            }
+
+def cost_class_for(endpoint, method):
+    if endpoint in BATCH_ENDPOINTS:
+        return 'read'
+    if method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+        return 'expensive' if endpoint in EXPENSIVE_ENDPOINTS else 'write'
+    if endpoint in EXPENSIVE_ENDPOINTS:
+        return 'expensive'
+    return 'read'
+
+def client_key():
+    return (current_tenant(), session.get('user_id') or request.remote_addr)
+
+def admit_sub_request(endpoint, method):
+    """Charge a batch sub-request as if it had been sent on its own.
+
+    Sub-requests are dispatched directly, skipping before_request, so the
+    batch route calls this for each one. Returns None or (reason, retry_after).
+    """
+    if not current_app.config.get('ADMISSION_ENABLED', True):
+        return None
+    controller = current_app.extensions['admission']
+    return controller.admit(client_key(), cost_class_for(endpoint, method), hold_slot=False)
+
+def init_admission(app):
+    controller = AdmissionController(
+        max_concurrency=app.config.get('ADMISSION_MAX_CONCURRENCY', 32),
+        expensive_share=app.config.get('ADMISSION_EXPENSIVE_SHARE', 0.5),
+        rates=app.config.get('ADMISSION_RATES')
+    )
+    app.extensions['admission'] = controller
+
+    @app.before_request
+    def admit_request():
+        if not app.config.get('ADMISSION_ENABLED', True):
+            return None
+        if request.method == 'OPTIONS' or request.blueprint is None:
+            return None
+        rejected = controller.admit(client_key(), cost_class_for(request.endpoint, request.method))
+        if rejected:
+            reason, retry_after = rejected
+            response = jsonify({'error': 'Too many requests', 'reason': reason})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        # Kept on the environ rather than g so batch sub-requests, which share
+        # the app context, do not release the outer request's slot
+        request.environ['smartsupport.admitted'] = True
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        if request.environ.pop('smartsupport.admitted', False):
+            controller.release()
+
+    return controller
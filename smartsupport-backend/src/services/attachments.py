@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import os
+import re
+import tarfile
+import tempfile
+import time
+from datetime import timedelta
+from flask import current_app
+from src.models.user import AttachmentContent
+from src.services.jobs import task
+from src.services.tenants import DEFAULT_TENANT, current_tenant
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Blobs and temp files younger than this may belong to an upload that has
+# not committed yet, so the sweep leaves them alone
+ORPHAN_MIN_AGE_SECONDS = 3600
+SWEEP_BATCH_SIZE = 500
+
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+class QuotaExceeded(Exception):
+    pass
+
+def store_root():
+    tenant = current_tenant()
+    if tenant == DEFAULT_TENANT:
+        return current_app.config['ATTACHMENT_STORE']
+    return os.path.join(current_app.config['ATTACHMENT_STORE'], 'tenants', tenant)
+
+def blob_path(sha256):
+    return os.path.join(store_root(), sha256[:2], sha256[2:4], sha256)
+
+def store_stream(stream, max_bytes):
+    """Copy a stream into the content-addressed store chunk by chunk.
+
+    Returns (sha256, size). Content already present in the store is not
+    written twice. Raises QuotaExceeded once more than max_bytes is read.
+    """
+    tmp_dir = os.path.join(store_root(), 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise QuotaExceeded()
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            # Reusing a blob makes it young again, so the orphan sweep cannot
+            # delete it before this upload commits its row
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _blob_files(root):
+    """(sha256, path) for every blob under root, shard directories only"""
+    for first in sorted(os.listdir(root)):
+        first_dir = os.path.join(root, first)
+        if len(first) != 2 or not os.path.isdir(first_dir):
+            continue
+        for second in sorted(os.listdir(first_dir)):
+            second_dir = os.path.join(first_dir, second)
+            if len(second) != 2 or not os.path.isdir(second_dir):
+                continue
+            for name in os.listdir(second_dir):
+                yield name, os.path.join(second_dir, name)
+
+def _remove_unreferenced(batch, cutoff):
+    referenced = {
+        sha256 for (sha256,) in AttachmentContent.query.with_entities(AttachmentContent.sha256)
+        .filter(AttachmentContent.sha256.in_(list(batch))).distinct()
+    }
+    removed = 0
+    for sha256, path in batch.items():
+        # Checked again in case an upload reused the blob since it was listed
+        if sha256 not in referenced and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
+
+@task('attachments.sweep_orphans', every=timedelta(hours=6))
+def sweep_orphan_blobs(min_age_seconds=ORPHAN_MIN_AGE_SECONDS):
+    """Delete blobs no attachment references, e.g. from uploads over quota.
+
+    Runs for the worker's tenant. Only files older than min_age_seconds
+    are considered, which covers uploads still streaming or committing.
+    """
+    root = store_root()
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - min_age_seconds
+    removed = 0
+
+    tmp_dir = os.path.join(root, 'tmp')
+    if os.path.isdir(tmp_dir):
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+    batch = {}
+    for sha256, path in _blob_files(root):
+        if os.path.getmtime(path) >= cutoff:
+            continue
+        batch[sha256] = path
+        if len(batch) >= SWEEP_BATCH_SIZE:
+            removed += _remove_unreferenced(batch, cutoff)
+            batch = {}
+    if batch:
+        removed += _remove_unreferenced(batch, cutoff)
+    if removed:
+        logger.info('Removed %s orphaned attachment blobs', removed)
+    return removed
+
+# Moving a tenant between nodes, see the tenant-export and tenant-import commands
+
+def archive_path_for(database_path):
+    """Where the blobs travel next to an exported tenant database"""
+    return f'{database_path}.attachments.tar'
+
+def export_blobs(archive_path):
+    """Write every blob of the current tenant to a tar archive; returns the count"""
+    root = store_root()
+    count = 0
+    with tarfile.open(archive_path, 'w') as archive:
+        if os.path.isdir(root):
+            for sha256, path in _blob_files(root):
+                archive.add(path, arcname=sha256)
+                count += 1
+    return count
+
+def import_blobs(archive_path):
+    """Store every blob of an export_blobs archive for the current tenant.
+
+    Blobs go through store_stream, so each one is checked against its name
+    and content already present is not written twice. Returns the count.
+    """
+    count = 0
+    with tarfile.open(archive_path, 'r') as archive:
+        for member in archive:
+            if not member.isfile() or not _SHA256.match(member.name):
+                raise ValueError(f'Unexpected entry {member.name!r} in attachment archive')
+            sha256, _ = store_stream(archive.extractfile(member), member.size)
+            if sha256 != member.name:
+                raise ValueError(f'Blob {member.name} does not match its content')
+            count += 1
+    return count
@@ -0,0 +1,121 @@
+import re
+from src.models.user import db, AuditEvent, Attachment, Log, TicketStatus, User
+from src.services.backfill import Backfill, register_backfill
+
+def priority_code(priority):
+    return AuditEvent.PRIORITY_CODES.get(priority)
+
+def record_event(ticket_id, actor_id, event, field=None, old_value=None, new_value=None, timestamp=None):
+    audit_event = AuditEvent(
+        ticket_id=ticket_id,
+        actor_id=actor_id,
+        event=event,
+        field=field,
+        old_value=old_value,
+        new_value=new_value
+    )
+    if timestamp:
+        audit_event.timestamp = timestamp
+    db.session.add(audit_event)
+    return audit_event
+
+def record_change(ticket_id, actor_id, field, old_value=None, new_value=None):
+    return record_event(ticket_id, actor_id, AuditEvent.FIELD_CHANGED, field, old_value, new_value)
+
+# Conversion of the legacy free-text Log rows
+
+_CREATED = re.compile(r'^Ticket created with priority (?P<priority>.*)$')
+_PRIORITY = re.compile(r'^Priority changed from (?P<old>.*) to (?P<new>.*)$')
+_STATUS = re.compile(r'^Status changed from (?P<old>.*) to (?P<new>.*)$')
+_ASSIGNED = re.compile(r'^Assigned from (?P<old>.*) to (?P<new>.*)$')
+_ATTACHMENT = re.compile(r'^Attachment (?P<name>.*) uploaded$')
+
+class _Lookups:
+    """Name -> id caches used during one conversion run"""
+
+    def __init__(self):
+        self.statuses = {status.name: status.id for status in TicketStatus.query.all()}
+        self.users = {}
+
+    def user_id(self, name):
+        if name == 'Unassigned':
+            return None
+        if name not in self.users:
+            user = User.query.filter_by(name=name).order_by(User.id).first()
+            self.users[name] = user.id if user else None
+        return self.users[name]
+
+    def status_id(self, name):
+        return self.statuses.get(name)
+
+def parse_legacy_action(log, lookups):
+    """Translate a Log row into AuditEvent column values, or None if unknown"""
+    action = (log.action or '').strip()
+
+    match = _CREATED.match(action)
+    if match:
+        return {'event': AuditEvent.TICKET_CREATED, 'field': AuditEvent.PRIORITY,
+                'new_value': priority_code(match.group('priority'))}
+    if action.startswith('Subject changed from '):
+        return {'event': AuditEvent.FIELD_CHANGED, 'field': AuditEvent.SUBJECT}
+    if action == 'Description updated':
+        return {'event': AuditEvent.FIELD_CHANGED, 'field': AuditEvent.DESCRIPTION}
+    if action == 'Category updated':
+        return {'event': AuditEvent.FIELD_CHANGED, 'field': AuditEvent.CATEGORY}
+    match = _PRIORITY.match(action)
+    if match:
+        return {'event': AuditEvent.FIELD_CHANGED, 'field': AuditEvent.PRIORITY,
+                'old_value': priority_code(match.group('old')),
+                'new_value': priority_code(match.group('new'))}
+    match = _STATUS.match(action)
+    if match:
+        return {'event': AuditEvent.FIELD_CHANGED, 'field': AuditEvent.STATUS,
+                'old_value': lookups.status_id(match.group('old')),
+                'new_value': lookups.status_id(match.group('new'))}
+    match = _ASSIGNED.match(action)
+    if match:
+        return {'event': AuditEvent.FIELD_CHANGED, 'field': AuditEvent.ASSIGNEE,
+                'old_value': lookups.user_id(match.group('old')),
+                'new_value': lookups.user_id(match.group('new'))}
+    if action == 'Comment added (internal)':
+        return {'event': AuditEvent.INTERNAL_COMMENT_ADDED}
+    if action == 'Comment added':
+        return {'event': AuditEvent.COMMENT_ADDED}
+    match = _ATTACHMENT.match(action)
+    if match:
+        attachment = Attachment.query.filter_by(ticket_id=log.ticket_id, file_name=match.group('name')).first()
+        return {'event': AuditEvent.ATTACHMENT_ADDED, 'new_value': attachment.id if attachment else None}
+    return None
+
+@register_backfill
+class ConvertLegacyLogs(Backfill):
+    """Copy parseable Log rows into AuditEvent.
+
+    The conversion loses detail (subjects, names that no longer match a
+    user), so Log rows are kept as the original record. Each event points
+    back at its Log row through legacy_log_id, which also makes a rerun
+    skip rows that were already converted.
+    """
+
+    name = 'audit-logs'
+    model = Log
+    description = 'Convert free-text ticket logs into structured audit events'
+
+    def setup(self):
+        self.lookups = _Lookups()
+
+    def process(self, rows):
+        converted = {
+            log_id for (log_id,) in db.session.query(AuditEvent.legacy_log_id).filter(
+                AuditEvent.legacy_log_id.in_([log.id for log in rows])
+            )
+        }
+        for log in rows:
+            if log.id in converted:
+                continue
+            values = parse_legacy_action(log, self.lookups)
+            if values is None:
+                self.skip(log, f'unrecognised action {log.action!r}')
+                continue
+            audit_event = record_event(log.ticket_id, log.actor_id, timestamp=log.timestamp, **values)
+            audit_event.legacy_log_id = log.id
@@ -0,0 +1,148 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from src.models.user import db, BackfillCheckpoint, SLAPolicy
+
+logger = logging.getLogger(__name__)
+
+BACKFILLS = {}
+
+def register_backfill(cls):
+    BACKFILLS[cls.name] = cls
+    return cls
+
+class Backfill(ABC):
+    """A data migration applied to one model in small id-ordered batches.
+
+    Subclasses set name and model and implement process(rows), which may
+    modify, add or delete rows through db.session. Each batch is committed
+    on its own, so the SQLite write lock is only held for one batch. Rows
+    that cannot be migrated should be passed to skip() rather than raising,
+    which would roll back the batch and stop the run at the same id.
+    """
+
+    name = None
+    model = None
+    description = ''
+
+    def __init__(self):
+        self.skipped = 0
+
+    def setup(self):
+        pass
+
+    def skip(self, row, reason):
+        """Leave a row unchanged and record why"""
+        self.skipped += 1
+        logger.warning('Backfill %s skipped %s %s: %s', self.name, type(row).__name__, row.id, reason)
+
+    @abstractmethod
+    def process(self, rows):
+        """Migrate one batch of rows"""
+
+def _get_checkpoint(name, restart):
+    checkpoint = db.session.get(BackfillCheckpoint, name)
+    if checkpoint and restart:
+        db.session.delete(checkpoint)
+        db.session.flush()
+        checkpoint = None
+    if not checkpoint:
+        checkpoint = BackfillCheckpoint(name=name, last_id=0, rows_processed=0, rows_skipped=0)
+        db.session.add(checkpoint)
+        db.session.commit()
+    return checkpoint
+
+def run_backfill(name, batch_size=500, throttle=0.05, max_batches=None, restart=False, progress=None):
+    """Run (or resume) a registered backfill from its checkpoint.
+
+    throttle is the pause in seconds between batches so request handlers
+    can take the write lock; max_batches stops early, leaving the
+    checkpoint to resume from. progress, if given, is called after each
+    batch with the checkpoint, the rows done in this run and the rows that
+    were pending when it started. Returns the checkpoint.
+    """
+    backfill = BACKFILLS[name]()
+    backfill.setup()
+    model = backfill.model
+    checkpoint = _get_checkpoint(name, restart)
+
+    pending = model.query.filter(model.id > checkpoint.last_id).count()
+    done = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        # Writing first takes SQLite's write lock for the whole batch, so
+        # request handlers cannot commit between the batch's reads and writes
+        checkpoint.updated_at = datetime.utcnow()
+        db.session.flush()
+        rows = model.query.filter(model.id > checkpoint.last_id).order_by(model.id.asc()).limit(batch_size).all()
+        if not rows:
+            checkpoint.completed_at = datetime.utcnow()
+            db.session.commit()
+            break
+
+        last_id = rows[-1].id
+        backfill.skipped = 0
+        backfill.process(rows)
+        checkpoint.last_id = last_id
+        checkpoint.rows_processed += len(rows)
+        checkpoint.rows_skipped = (checkpoint.rows_skipped or 0) + backfill.skipped
+        db.session.commit()
+        done += len(rows)
+        batches += 1
+
+        if progress:
+            progress(checkpoint, done, pending)
+        if throttle:
+            time.sleep(throttle)
+
+    return checkpoint
+
+def backfill_status():
+    checkpoints = {checkpoint.name: checkpoint for checkpoint in BackfillCheckpoint.query.all()}
+    return [
+        {
+            'name': name,
+            'description': cls.description,
+            'checkpoint': checkpoints[name].to_dict() if name in checkpoints else None
+        }
+        for name, cls in sorted(BACKFILLS.items())
+    ]
+
+# Built-in backfills
+
+@register_backfill
+class NormalizeEscalationPolicies(Backfill):
+    name = 'sla-escalation-policies'
+    model = SLAPolicy
+    description = 'Rewrite SLA escalation policies as {"levels": [...]} sorted by time'
+
+    def process(self, rows):
+        for policy in rows:
+            try:
+                current = policy.get_escalation_policy()
+            except ValueError as exc:
+                self.skip(policy, f'escalation_policy is not valid JSON ({exc})')
+                continue
+            if isinstance(current, dict):
+                normalized = dict(current)
+                levels = current.get('levels', [])
+            elif isinstance(current, list):
+                normalized = {}
+                levels = current
+            else:
+                self.skip(policy, 'escalation_policy is neither an object nor a list')
+                continue
+            if not isinstance(levels, list):
+                self.skip(policy, '"levels" is not a list')
+                continue
+            # Entries that are not objects keep their order, after the sorted levels
+            normalized['levels'] = sorted(
+                (level for level in levels if isinstance(level, dict)),
+                key=lambda level: _minutes(level.get('time_minutes'))
+            ) + [level for level in levels if not isinstance(level, dict)]
+            if normalized != current:
+                policy.set_escalation_policy(normalized)
+
+def _minutes(value):
+    return value if isinstance(value, (int, float)) else 0
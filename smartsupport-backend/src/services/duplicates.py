@@ -0,0 +1,183 @@
+import re
+import random
+import threading
+import zlib
+from src.models.user import Ticket, TicketStatus
+from src.services.tenants import PerTenant, current_tenant
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MIN_SIMILARITY = 0.5
+MAX_RESULTS = 5
+# Duplicates are recognisable from the start of a ticket; capping the words
+# keeps a pasted log from making every signature cost hundreds of ms
+MAX_WORDS = 80
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_WORD = re.compile(r'[a-z0-9]+')
+_STOPWORDS = {'a', 'an', 'the', 'and', 'or', 'to', 'of', 'in', 'on', 'is', 'it', 'i', 'my', 'for', 'with', 'not', 'be'}
+
+def shingles(subject, description):
+    """Word unigrams and bigrams from the subject and description"""
+    text = f'{subject or ""} {description or ""}'.lower()
+    words = []
+    for match in _WORD.finditer(text):
+        word = match.group()
+        if word not in _STOPWORDS:
+            words.append(word)
+            if len(words) >= MAX_WORDS:
+                break
+    result = set(words)
+    result.update(f'{a} {b}' for a, b in zip(words, words[1:]))
+    return result
+
+def signature(shingle_set):
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+    if not hashes:
+        return None
+    return tuple(
+        min([((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes])
+        for a, b in _PERMUTATIONS
+    )
+
+def text_signature(subject, description):
+    """Signature of a ticket's text; compute once and pass it to query() and add()"""
+    return signature(shingles(subject, description))
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+def _bands(sig):
+    return [(i, sig[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+# What a query is compared against: the whole text, or only the subject
+# while the description has not been typed yet. A few subject words are
+# never similar enough to a stored subject + description, so partial
+# input gets its own signatures.
+FULL_TEXT = 0
+SUBJECT_ONLY = 1
+
+class DuplicateIndex:
+    """MinHash LSH index over open tickets.
+
+    Each ticket's signature is split into bands; tickets sharing any band
+    bucket become candidates, so a lookup only touches matching buckets
+    instead of every open ticket. Every ticket is indexed twice, by its
+    full text and by its subject alone.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # ticket_id -> ((full signature, subject signature), created_by, subject)
+        self._buckets = {}  # (kind, band, rows) -> set of ticket ids
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, ticket_id, subject, description, created_by, sig=None):
+        if sig is None:
+            sig = text_signature(subject, description)
+        subject_sig = sig if not description else text_signature(subject, None)
+        with self._lock:
+            self._remove_locked(ticket_id)
+            if sig is None:
+                return
+            sigs = (sig, subject_sig)
+            self._entries[ticket_id] = (sigs, created_by, subject)
+            for kind, kind_sig in enumerate(sigs):
+                if kind_sig is None:
+                    continue
+                for band in _bands(kind_sig):
+                    self._buckets.setdefault((kind,) + band, set()).add(ticket_id)
+
+    def remove(self, ticket_id):
+        with self._lock:
+            self._remove_locked(ticket_id)
+
+    def _remove_locked(self, ticket_id):
+        entry = self._entries.pop(ticket_id, None)
+        if not entry:
+            return
+        for kind, kind_sig in enumerate(entry[0]):
+            if kind_sig is None:
+                continue
+            for band in _bands(kind_sig):
+                key = (kind,) + band
+                bucket = self._buckets.get(key)
+                if bucket:
+                    bucket.discard(ticket_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def query(self, subject, description, created_by=None, exclude_id=None, limit=MAX_RESULTS, sig=None):
+        """Return likely duplicates as dicts sorted by estimated similarity.
+
+        When created_by is given only that user's tickets are considered.
+        Without a description only subjects are compared, so the check
+        works while the user is still typing.
+        """
+        if sig is None:
+            sig = text_signature(subject, description)
+        if sig is None:
+            return []
+        kind = FULL_TEXT if description and description.strip() else SUBJECT_ONLY
+        with self._lock:
+            candidates = set()
+            for band in _bands(sig):
+                candidates.update(self._buckets.get((kind,) + band, ()))
+            candidates.discard(exclude_id)
+            matches = []
+            for ticket_id in candidates:
+                other_sigs, owner, other_subject = self._entries[ticket_id]
+                if created_by is not None and owner != created_by:
+                    continue
+                score = similarity(sig, other_sigs[kind])
+                if score >= MIN_SIMILARITY:
+                    matches.append({'id': ticket_id, 'subject': other_subject, 'similarity': round(score, 2)})
+        matches.sort(key=lambda m: m['similarity'], reverse=True)
+        return matches[:limit]
+
+def _load_open_tickets(index):
+    open_tickets = Ticket.query.outerjoin(TicketStatus, Ticket.status == TicketStatus.id).filter(
+        (TicketStatus.is_terminal.is_(False)) | (TicketStatus.is_terminal.is_(None))
+    )
+    for ticket in open_tickets.yield_per(500):
+        index.add(ticket.id, ticket.subject, ticket.description, ticket.created_by)
+
+def _build_index():
+    index = DuplicateIndex()
+    _load_open_tickets(index)
+    return index
+
+# One index per tenant, built from that tenant's database on first use
+duplicate_indexes = PerTenant(_build_index)
+
+def get_duplicate_index():
+    return duplicate_indexes.get()
+
+def is_open(ticket):
+    return not (ticket.status_obj and ticket.status_obj.is_terminal)
+
+def sync_ticket(ticket, sig=None):
+    """Index an open ticket, or drop it once it reaches a terminal status"""
+    if is_open(ticket):
+        get_duplicate_index().add(ticket.id, ticket.subject, ticket.description, ticket.created_by, sig=sig)
+    else:
+        get_duplicate_index().remove(ticket.id)
+
+def rebuild_index():
+    duplicate_indexes.discard(current_tenant())
+    return len(get_duplicate_index())
@@ -0,0 +1,311 @@
+import hashlib
+import mailbox
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.header import decode_header, make_header
+from email.parser import BytesParser
+from email.utils import parseaddr, parsedate_to_datetime
+from sqlalchemy import func
+from src.models.user import db, Ticket, TicketStatus, Comment, User, AuditEvent, InboundMessage
+from src.services import audit, rollups
+
+# Email-to-ticket import from local mbox files or Maildir directories.
+# Messages are parsed one at a time and written in batches: each batch is
+# one flush and one commit, and the session is cleared afterwards, so
+# memory stays flat however large the mailbox is.
+
+MAX_BODY_CHARS = 100000
+SENDER_CACHE_SIZE = 10000
+
+# Imported users can only sign in after an admin sets a password
+UNUSABLE_PASSWORD = '!'
+
+_MESSAGE_ID = re.compile(r'<[^<>\s]+>')
+_TAG = re.compile(r'<[^>]*>')
+
+class ParsedMessage:
+    def __init__(self, message_id, references, sender_email, sender_name, subject, body, date):
+        self.message_id = message_id
+        self.references = references
+        self.sender_email = sender_email
+        self.sender_name = sender_name
+        self.subject = subject
+        self.body = body
+        self.date = date
+
+def open_mailbox(path):
+    """Maildir for directories, mbox otherwise; neither loads messages up front"""
+    if os.path.isdir(path):
+        return mailbox.Maildir(path, factory=None, create=False)
+    return mailbox.mbox(path, factory=None, create=False)
+
+def iter_messages(path):
+    """Yield parsed email.message.Message objects one at a time.
+
+    The compat32 policy keeps headers as plain strings; only the few
+    headers the import reads are decoded, which is several times faster
+    than building structured header objects for every header.
+    """
+    source = open_mailbox(path)
+    parser = BytesParser()
+    try:
+        for key in source.iterkeys():
+            message_file = source.get_file(key)
+            try:
+                yield parser.parse(message_file)
+            finally:
+                message_file.close()
+    finally:
+        source.close()
+
+def _header(message, name):
+    value = message.get(name)
+    if value is None:
+        return None
+    value = str(value)
+    if '=?' in value:
+        try:
+            value = str(make_header(decode_header(value)))
+        except (LookupError, UnicodeError, ValueError):
+            # Malformed encoded words are kept as they are rather than failing the import
+            pass
+    return ' '.join(value.split())
+
+def _message_date(message):
+    value = _header(message, 'Date')
+    if not value:
+        return None
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+def _find_text_part(message):
+    html = None
+    for part in message.walk():
+        if part.is_multipart() or part.get_content_maintype() != 'text' or part.get_filename():
+            continue
+        subtype = part.get_content_subtype()
+        if subtype == 'plain':
+            return part
+        if subtype == 'html' and html is None:
+            html = part
+    return html
+
+def _message_body(message):
+    part = _find_text_part(message)
+    if part is None:
+        return ''
+    payload = part.get_payload(decode=True) or b''
+    try:
+        body = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+    except LookupError:
+        body = payload.decode('utf-8', errors='replace')
+    if part.get_content_subtype() == 'html':
+        body = _TAG.sub('', body)
+    return body.strip()[:MAX_BODY_CHARS]
+
+def parse_message(message):
+    """Extract the fields used for ticketing from an email message"""
+    sender_name, sender_email = parseaddr(_header(message, 'From') or '')
+    subject = _header(message, 'Subject') or '(no subject)'
+    body = _message_body(message)
+    date = _message_date(message)
+
+    ids = _MESSAGE_ID.findall(_header(message, 'Message-ID') or '')
+    if ids:
+        message_id = ids[0]
+    else:
+        # Stable fallback so re-importing the same mailbox skips the message
+        digest = hashlib.sha256('\0'.join([sender_email, subject, str(date), body]).encode('utf-8')).hexdigest()
+        message_id = f'<{digest}@smartsupport.invalid>'
+
+    # Closest parent first: In-Reply-To, then References from last to first
+    references = _MESSAGE_ID.findall(_header(message, 'In-Reply-To') or '')
+    references += reversed(_MESSAGE_ID.findall(_header(message, 'References') or ''))
+
+    return ParsedMessage(
+        message_id=message_id,
+        references=references,
+        sender_email=sender_email.strip().lower(),
+        sender_name=sender_name.strip(),
+        subject=subject[:1000],
+        body=body,
+        date=date
+    )
+
+class SenderCache:
+    """Email -> (user id, role), bounded LRU, resolved a batch at a time"""
+
+    def __init__(self, create_users=True, size=SENDER_CACHE_SIZE):
+        self.create_users = create_users
+        self.size = size
+        self._users = OrderedDict()
+        self.created = 0
+
+    def get(self, email):
+        if email not in self._users:
+            return None
+        self._users.move_to_end(email)
+        return self._users[email]
+
+    def _put(self, email, user):
+        self._users[email] = (user.id, user.role)
+        self._users.move_to_end(email)
+        while len(self._users) > self.size:
+            self._users.popitem(last=False)
+
+    def resolve(self, names):
+        """Load (and optionally create) every sender of a batch, given email -> display name"""
+        missing = {email for email in names if email and email not in self._users}
+        if not missing:
+            return
+        # Addresses are case-insensitive in practice; match however the account was registered
+        for user in User.query.filter(func.lower(User.email).in_(missing)).order_by(User.id).all():
+            email = user.email.lower()
+            if email in missing:
+                self._put(email, user)
+                missing.discard(email)
+        if not self.create_users or not missing:
+            return
+        new_users = []
+        for email in missing:
+            user = User(
+                name=names[email] or email.split('@')[0],
+                email=email,
+                role='End-User',
+                password_hash=UNUSABLE_PASSWORD
+            )
+            db.session.add(user)
+            new_users.append(user)
+        db.session.flush()
+        for user in new_users:
+            self._put(user.email, user)
+        self.created += len(new_users)
+
+def _batches(messages, batch_size):
+    batch = []
+    for message in messages:
+        batch.append(parse_message(message))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _known_threads(batch):
+    """Map every Message-ID mentioned in the batch that is already imported to its ticket"""
+    ids = set()
+    for parsed in batch:
+        ids.add(parsed.message_id)
+        ids.update(parsed.references)
+    rows = db.session.query(InboundMessage.message_id, InboundMessage.ticket_id).filter(
+        InboundMessage.message_id.in_(ids)
+    ).all()
+    return dict(rows)
+
+def import_mailbox(path, batch_size=500, create_users=True, progress=None):
+    """Import every message in path as a ticket, or as a comment when it replies to one.
+
+    Messages whose Message-ID was imported before are skipped, so an
+    interrupted import can simply be run again. progress, if given, is
+    called with the running stats after each batch. Returns the stats.
+    """
+    open_status = TicketStatus.query.filter_by(name='Open').first()
+    if not open_status:
+        raise LookupError('Default status not found')
+    open_status_id = open_status.id
+
+    senders = SenderCache(create_users=create_users)
+    stats = {'messages': 0, 'tickets': 0, 'comments': 0, 'skipped': 0, 'users_created': 0}
+
+    for batch in _batches(iter_messages(path), batch_size):
+        known = _known_threads(batch)
+        senders.resolve({parsed.sender_email: parsed.sender_name for parsed in batch})
+        tickets = {
+            ticket.id: ticket
+            for ticket in Ticket.query.filter(Ticket.id.in_(set(known.values()))).all()
+        }
+        threads = {}  # Message-ID -> Ticket, for messages in this batch
+        imported = []
+
+        for parsed in batch:
+            stats['messages'] += 1
+            sender = senders.get(parsed.sender_email)
+            if not sender or parsed.message_id in known or parsed.message_id in threads:
+                stats['skipped'] += 1
+                continue
+            sender_id, sender_role = sender
+            received_at = parsed.date or datetime.utcnow()
+
+            ticket = None
+            for reference in parsed.references:
+                ticket = threads.get(reference) or tickets.get(known.get(reference))
+                if ticket:
+                    break
+
+            if ticket:
+                comment = Comment(
+                    ticket=ticket,
+                    user_id=sender_id,
+                    comment_text=parsed.body or parsed.subject,
+                    is_internal=False,
+                    created_at=received_at
+                )
+                db.session.add(comment)
+                ticket.updated_at = max(ticket.updated_at or received_at, received_at)
+                stats['comments'] += 1
+            else:
+                comment = None
+                ticket = Ticket(
+                    subject=parsed.subject,
+                    description=parsed.body,
+                    priority='Medium',
+                    status=open_status_id,
+                    created_by=sender_id,
+                    created_at=received_at,
+                    updated_at=received_at
+                )
+                db.session.add(ticket)
+                stats['tickets'] += 1
+
+            threads[parsed.message_id] = ticket
+            imported.append((parsed, ticket, comment, sender_id, sender_role, received_at))
+
+        # One flush assigns every id in the batch
+        db.session.flush()
+        batch_rollups = rollups.RollupBatch()
+        batch_rollups.load_metrics(list(tickets))
+
+        for parsed, ticket, comment, sender_id, sender_role, received_at in imported:
+            db.session.add(InboundMessage(
+                message_id=parsed.message_id,
+                ticket_id=ticket.id,
+                comment_id=comment.id if comment else None,
+                sender_id=sender_id,
+                received_at=received_at
+            ))
+            if comment:
+                audit.record_event(ticket.id, sender_id, AuditEvent.COMMENT_ADDED, timestamp=comment.created_at)
+                batch_rollups.comment(ticket, comment, sender_id, sender_role)
+            else:
+                audit.record_event(
+                    ticket.id, sender_id, AuditEvent.TICKET_CREATED,
+                    field=AuditEvent.PRIORITY, new_value=audit.priority_code(ticket.priority),
+                    timestamp=ticket.created_at
+                )
+                batch_rollups.ticket_created(ticket)
+
+        batch_rollups.apply()
+        db.session.commit()
+        db.session.expunge_all()
+        stats['users_created'] = senders.created
+        if progress:
+            progress(stats)
+
+    return stats
@@ -0,0 +1,188 @@
+import json
+import logging
+import random
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import case, exists, insert, literal, select, update
+from src.models.user import db, Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+LEASE_SECONDS = 300
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+
+class Task:
+    def __init__(self, name, func, max_attempts, every, lease):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.every = every
+        self.lease = lease
+
+def task(name, max_attempts=5, every=None, lease_seconds=LEASE_SECONDS):
+    """Register a job handler; every=timedelta makes it recurring.
+
+    lease_seconds must exceed the task's longest run: a job still running
+    after its lease is assumed to have lost its worker and is run again.
+    """
+    def decorator(func):
+        TASKS[name] = Task(name, func, max_attempts, every, timedelta(seconds=lease_seconds))
+        return func
+    return decorator
+
+def enqueue(task_name, payload=None, run_at=None, delay=None):
+    """Add a job to the current session; it is committed with the caller's changes"""
+    registered = TASKS[task_name]
+    if run_at is None:
+        run_at = datetime.utcnow() + (delay or timedelta(0))
+    job = Job(
+        task=task_name,
+        status='queued',
+        run_at=run_at,
+        attempts=0,
+        max_attempts=registered.max_attempts,
+        interval_seconds=int(registered.every.total_seconds()) if registered.every else None
+    )
+    job.set_payload(payload or {})
+    db.session.add(job)
+    return job
+
+def _enqueue_recurring(registered, payload=None, delay=None):
+    """Queue a recurring task unless it already has a pending job.
+
+    The check and the insert are one INSERT ... SELECT WHERE NOT EXISTS
+    statement, which SQLite runs under its write lock, so workers starting
+    at the same time cannot both queue it.
+    """
+    pending = exists().where(Job.task == registered.name, Job.status.in_(['queued', 'running']))
+    values = {
+        'task': registered.name,
+        'payload': json.dumps(payload or {}),
+        'status': 'queued',
+        'run_at': datetime.utcnow() + (delay or timedelta(0)),
+        'attempts': 0,
+        'max_attempts': registered.max_attempts,
+        'interval_seconds': int(registered.every.total_seconds()),
+        'created_at': datetime.utcnow()
+    }
+    db.session.execute(insert(Job).from_select(
+        list(values),
+        select(*[literal(value, type_=Job.__table__.c[column].type) for column, value in values.items()]).where(~pending)
+    ))
+
+def ensure_recurring_jobs():
+    """Queue one job for every recurring task that has none pending"""
+    for registered in TASKS.values():
+        if registered.every:
+            _enqueue_recurring(registered)
+    db.session.commit()
+
+def _lease_expiry(now):
+    leases = {name: now + registered.lease for name, registered in TASKS.items()}
+    default = now + timedelta(seconds=LEASE_SECONDS)
+    if not leases:
+        return literal(default, type_=Job.lease_expires_at.type)
+    return case(leases, value=Job.task, else_=default)
+
+def claim_jobs(batch_size):
+    """Atomically mark up to batch_size due jobs as running and return them.
+
+    The claim is a single UPDATE, so concurrent workers never get the
+    same job, and it counts the attempt. A job whose lease expired lost
+    its worker; it is claimed again while it has attempts left and
+    failed otherwise, so a job that kills its worker is not retried
+    forever.
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    expired = (Job.status == 'running') & (Job.lease_expires_at < now)
+    db.session.execute(
+        update(Job).where(expired, Job.attempts >= Job.max_attempts).values(
+            status='failed',
+            claim_token=None,
+            finished_at=now,
+            last_error='Lease expired; the worker running the job stopped'
+        ),
+        execution_options={'synchronize_session': False}
+    )
+    due = select(Job.id).where(
+        ((Job.status == 'queued') & (Job.run_at <= now)) | expired
+    ).order_by(Job.run_at).limit(batch_size)
+    db.session.execute(
+        update(Job).where(Job.id.in_(due)).values(
+            status='running',
+            claim_token=token,
+            locked_at=now,
+            lease_expires_at=_lease_expiry(now),
+            attempts=Job.attempts + 1
+        ),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return Job.query.filter_by(claim_token=token).order_by(Job.run_at).all()
+
+def _backoff(attempts):
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+def run_job(job):
+    """Run one claimed job; its side effects commit together with its new status"""
+    registered = TASKS.get(job.task)
+    attempt = job.attempts  # counted when the job was claimed
+    try:
+        if not registered:
+            raise LookupError(f'Unknown task {job.task}')
+        registered.func(**job.get_payload())
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        job.last_error = traceback.format_exc(limit=5)
+        if attempt < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + _backoff(attempt)
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        logger.warning('Job %s (%s) failed, attempt %s', job.id, job.task, attempt)
+    else:
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        if job.interval_seconds and registered.every:
+            # Flushed first so this job no longer counts as pending
+            db.session.flush()
+            _enqueue_recurring(registered, job.get_payload(), delay=timedelta(seconds=job.interval_seconds))
+    job.claim_token = None
+    job.lease_expires_at = None
+    db.session.commit()
+
+def work(batch_size=10, poll_interval=1.0, once=False, should_stop=None):
+    """Claim and run jobs until stopped; once=True drains due jobs and returns"""
+    ensure_recurring_jobs()
+    processed = 0
+    while not (should_stop and should_stop()):
+        jobs = claim_jobs(batch_size)
+        for job in jobs:
+            run_job(job)
+            processed += 1
+        if not jobs:
+            if once:
+                break
+            time.sleep(poll_interval)
+    return processed
+
+def queue_counts():
+    rows = db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all()
+    return dict(rows)
+
+# Built-in tasks
+
+@task('jobs.purge_finished', every=timedelta(days=1))
+def purge_finished_jobs(days=7):
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    Job.query.filter(Job.status == 'done', Job.finished_at < cutoff).delete(synchronize_session=False)
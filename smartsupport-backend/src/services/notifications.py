@@ -0,0 +1,15 @@
+from src.models.user import db, Notification, Ticket
+from src.services.jobs import task
+
+@task('notifications.ticket_assigned')
+def notify_ticket_assigned(ticket_id, assignee_id):
+    ticket = db.session.get(Ticket, ticket_id)
+    # Skip if the ticket is gone or was reassigned before the job ran
+    if not ticket or ticket.assigned_to != assignee_id:
+        return
+    notification = Notification(
+        recipient_id=assignee_id,
+        event_type='ticket_assigned',
+        message=f'Ticket #{ticket.id} "{ticket.subject}" was assigned to you'
+    )
+    db.session.add(notification)
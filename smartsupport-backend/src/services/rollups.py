@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import datetime
+from src.models.user import db, Ticket, TicketStatus, Comment, User, AuditEvent, TicketMetrics, DailyTicketRollup
+from src.services.backfill import Backfill, register_backfill
+
+STAFF_ROLES = ['Admin', 'Agent', 'L1', 'L2', 'L3']
+
+# A ticket's TicketMetrics row records what the rollups already count for
+# it: the row existing means its creation is counted, and
+# first_response_at / resolved_at mean those are. Every writer below checks
+# it before bumping a rollup, so live hooks, bulk imports and the backfill
+# can run at the same time without counting anything twice.
+
+def _minutes_between(start, end):
+    if not start or not end:
+        return 0.0
+    return max((end - start).total_seconds() / 60.0, 0.0)
+
+def _count_created(ticket, bump):
+    metrics = TicketMetrics(ticket_id=ticket.id)
+    db.session.add(metrics)
+    created_at = ticket.created_at or datetime.utcnow()
+    # Creation is never attributed to an agent: the live hook runs before
+    # anyone is assigned and the backfill would see the current assignee,
+    # so only agent_id=None gives both paths the same buckets
+    bump(created_at.date(), ticket.category_id, ticket.priority, None, created_count=1)
+    return metrics
+
+def _get_metrics(ticket, bump=None):
+    """The ticket's metrics, counting its creation first if nothing has yet"""
+    metrics = db.session.get(TicketMetrics, ticket.id)
+    if not metrics:
+        metrics = _count_created(ticket, bump or _bump)
+    return metrics
+
+def _bump(day, category_id, priority, agent_id, **deltas):
+    """Add deltas to the rollup row for one (day, category, priority, agent) bucket"""
+    rollup = DailyTicketRollup.query.filter_by(
+        day=day,
+        category_id=category_id,
+        priority=priority,
+        agent_id=agent_id
+    ).first()
+    if not rollup:
+        rollup = DailyTicketRollup(
+            day=day,
+            category_id=category_id,
+            priority=priority,
+            agent_id=agent_id,
+            created_count=0,
+            resolved_count=0,
+            first_response_count=0,
+            first_response_minutes=0.0,
+            resolution_minutes=0.0
+        )
+        db.session.add(rollup)
+    for field, delta in deltas.items():
+        setattr(rollup, field, getattr(rollup, field) + delta)
+    return rollup
+
+def _count_first_response(ticket, metrics, responded_at, responder_id, bump):
+    metrics.first_response_at = responded_at
+    bump(
+        responded_at.date(), ticket.category_id, ticket.priority, responder_id,
+        first_response_count=1,
+        first_response_minutes=_minutes_between(ticket.created_at, responded_at)
+    )
+
+def _count_resolution(ticket, metrics, resolved_at, bump):
+    metrics.resolved_at = resolved_at
+    bump(
+        resolved_at.date(), ticket.category_id, ticket.priority, ticket.assigned_to,
+        resolved_count=1,
+        resolution_minutes=_minutes_between(ticket.created_at, resolved_at)
+    )
+
+# Incremental updates, called from the request handlers before they commit
+
+def record_ticket_created(ticket):
+    _get_metrics(ticket)
+
+def _is_response(ticket, comment, author_id, author_role):
+    return not comment.is_internal and author_role in STAFF_ROLES and author_id != ticket.created_by
+
+def record_comment(ticket, comment, author):
+    """Count the first public staff reply as the ticket's first response"""
+    if not _is_response(ticket, comment, author.id, author.role):
+        return
+    metrics = _get_metrics(ticket)
+    if metrics.first_response_at:
+        return
+    _count_first_response(ticket, metrics, comment.created_at or datetime.utcnow(), author.id, _bump)
+
+def record_status_change(ticket, old_status, new_status):
+    """Count a ticket as resolved the first time it enters a terminal status"""
+    was_terminal = bool(old_status and old_status.is_terminal)
+    is_terminal = bool(new_status and new_status.is_terminal)
+    if was_terminal or not is_terminal:
+        return
+    metrics = _get_metrics(ticket)
+    if metrics.resolved_at:
+        return
+    _count_resolution(ticket, metrics, datetime.utcnow(), _bump)
+
+class RollupBatch:
+    """Incremental updates for many tickets at once, for bulk imports.
+
+    Deltas are summed per rollup bucket in memory and written by apply(),
+    one query per bucket instead of one per ticket. Call load_metrics()
+    with the existing tickets the batch touches before recording
+    comments on them.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.deltas = defaultdict(lambda: defaultdict(float))
+
+    def load_metrics(self, ticket_ids):
+        for metrics in TicketMetrics.query.filter(TicketMetrics.ticket_id.in_(ticket_ids)).all():
+            self.metrics[metrics.ticket_id] = metrics
+
+    def _bump(self, day, category_id, priority, agent_id, **deltas):
+        bucket = self.deltas[(day, category_id, priority, agent_id)]
+        for field, delta in deltas.items():
+            bucket[field] += delta
+
+    def _get_metrics(self, ticket):
+        metrics = self.metrics.get(ticket.id)
+        if not metrics:
+            metrics = self.metrics[ticket.id] = _count_created(ticket, self._bump)
+        return metrics
+
+    def ticket_created(self, ticket):
+        self._get_metrics(ticket)
+
+    def comment(self, ticket, comment, author_id, author_role):
+        if not _is_response(ticket, comment, author_id, author_role):
+            return
+        metrics = self._get_metrics(ticket)
+        if metrics.first_response_at:
+            return
+        _count_first_response(ticket, metrics, comment.created_at or datetime.utcnow(), author_id, self._bump)
+
+    def apply(self):
+        for (day, category_id, priority, agent_id), deltas in self.deltas.items():
+            counts = {field: int(delta) if field.endswith('_count') else delta for field, delta in deltas.items()}
+            _bump(day, category_id, priority, agent_id, **counts)
+        self.metrics.clear()
+        self.deltas.clear()
+
+# Backfill from existing tickets, comments and audit events
+
+def _find_resolved_at(ticket, terminal_ids):
+    event = AuditEvent.query.filter(
+        AuditEvent.ticket_id == ticket.id,
+        AuditEvent.event == AuditEvent.FIELD_CHANGED,
+        AuditEvent.field == AuditEvent.STATUS,
+        AuditEvent.new_value.in_(terminal_ids)
+    ).order_by(AuditEvent.timestamp.asc()).first()
+    return event.timestamp if event else ticket.updated_at
+
+def _find_first_response(ticket):
+    return Comment.query.join(User, Comment.user_id == User.id).filter(
+        Comment.ticket_id == ticket.id,
+        Comment.is_internal.is_(False),
+        Comment.user_id != ticket.created_by,
+        User.role.in_(STAFF_ROLES)
+    ).order_by(Comment.created_at.asc()).first()
+
+@register_backfill
+class BackfillRollups(Backfill):
+    name = 'ticket-rollups'
+    model = Ticket
+    description = 'Count tickets, first responses and resolutions missing from the daily rollups'
+
+    def setup(self):
+        self.terminal_ids = {status.id for status in TicketStatus.query.filter_by(is_terminal=True).all()}
+
+    def process(self, rows):
+        # Only what a ticket's metrics say is not counted yet is added, so
+        # tickets the request handlers update during the run are not
+        # counted twice and the reports never go empty
+        batch = RollupBatch()
+        batch.load_metrics([ticket.id for ticket in rows])
+        for ticket in rows:
+            metrics = batch._get_metrics(ticket)
+
+            if not metrics.first_response_at:
+                comment = _find_first_response(ticket)
+                if comment and comment.created_at:
+                    _count_first_response(ticket, metrics, comment.created_at, comment.user_id, batch._bump)
+
+            if not metrics.resolved_at and ticket.status in self.terminal_ids:
+                resolved_at = _find_resolved_at(ticket, self.terminal_ids)
+                if resolved_at:
+                    _count_resolution(ticket, metrics, resolved_at, batch._bump)
+        batch.apply()
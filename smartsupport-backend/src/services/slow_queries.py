@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.services.tenants import current_tenant
+
+# Statements slower than SLOW_QUERY_THRESHOLD_MS are written as JSON lines
+# to a rotating log and kept in a bounded in-memory ring for the admin
+# API. SQLite's EXPLAIN QUERY PLAN is collected right after the slow
+# statement, on the same connection, so full-table scans show up without
+# having to reproduce the query.
+
+MAX_STATEMENT_CHARS = 10000
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+def _redact_value(value):
+    """Keep numbers, flags and dates, which identify rows; hide text and blobs"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return f'<str len={len(value)}>'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f'<bytes len={len(value)}>'
+    return f'<{type(value).__name__}>'
+
+def redact_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: the first row is enough to see the shape
+            return {'rows': len(parameters), 'first': redact_parameters(parameters[0])}
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+def _scanned_tables(plan):
+    """Tables read without an index; SQLite reports them as 'SCAN <table>'"""
+    tables = []
+    for row in plan:
+        detail = row['detail']
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            tables.append(detail.split()[-1])
+    return tables
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms, log_path=None, ring_size=200, explain=True,
+                 max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.ring = deque(maxlen=ring_size)
+        self.total = 0
+        self.logger = None
+        if log_path:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger = logging.getLogger('smartsupport.slow_queries')
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            for previous in list(self.logger.handlers):
+                self.logger.removeHandler(previous)
+                previous.close()
+            self.logger.addHandler(handler)
+
+    def _explain(self, cursor, statement, parameters):
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        if isinstance(parameters, list) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+            parameters = parameters[0]
+        try:
+            # Raw DB-API connection, so this does not re-enter the engine events
+            rows = cursor.connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+        except Exception as exc:
+            return [{'id': None, 'parent': None, 'detail': f'EXPLAIN failed: {exc}'}]
+        return [{'id': row[0], 'parent': row[1], 'detail': row[3]} for row in rows]
+
+    def record(self, connection, cursor, statement, parameters, duration_ms):
+        entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'duration_ms': round(duration_ms, 2),
+            'statement': statement[:MAX_STATEMENT_CHARS],
+            'parameters': redact_parameters(parameters),
+            'tenant': current_tenant(),
+            'route': None,
+            'method': None,
+            'endpoint': None,
+            'plan': None,
+            'scanned_tables': []
+        }
+        if has_request_context():
+            entry['route'] = request.url_rule.rule if request.url_rule else request.path
+            entry['method'] = request.method
+            entry['endpoint'] = request.endpoint
+        if self.explain and connection.dialect.name == 'sqlite':
+            entry['plan'] = self._explain(cursor, statement, parameters)
+            if entry['plan']:
+                entry['scanned_tables'] = _scanned_tables(entry['plan'])
+
+        self.total += 1
+        self.ring.append(entry)
+        if self.logger:
+            self.logger.info(json.dumps(entry))
+        return entry
+
+    def recent(self, limit=50, scans_only=False):
+        """Most recent entries first"""
+        entries = [entry for entry in reversed(self.ring) if entry['scanned_tables'] or not scans_only]
+        return entries[:limit]
+
+    def clear(self):
+        self.ring.clear()
+
+def _active_log():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('slow_queries')
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_started', None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    slow_queries = _active_log()
+    if slow_queries and slow_queries.threshold_ms is not None and duration_ms >= slow_queries.threshold_ms:
+        slow_queries.record(connection, cursor, statement, parameters, duration_ms)
+
+def init_slow_query_log(app):
+    """Time every statement on every engine, including per-tenant ones"""
+    slow_queries = SlowQueryLog(
+        threshold_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS', 200),
+        log_path=app.config.get('SLOW_QUERY_LOG_PATH'),
+        ring_size=app.config.get('SLOW_QUERY_RING_SIZE', 200),
+        explain=app.config.get('SLOW_QUERY_EXPLAIN', True),
+        max_bytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backup_count=app.config.get('SLOW_QUERY_LOG_BACKUP_COUNT', 5)
+    )
+    app.extensions['slow_queries'] = slow_queries
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    return slow_queries
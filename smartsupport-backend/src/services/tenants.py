@@ -0,0 +1,79 @@
+import os
+import re
+import threading
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+
+DEFAULT_TENANT = 'default'
+
+_SLUG = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+_engines_lock = threading.Lock()
+
+def is_valid_tenant(tenant):
+    return bool(tenant and _SLUG.match(tenant))
+
+def tenant_db_path(app, tenant):
+    return os.path.join(app.config['TENANT_DATABASE_DIR'], f'{tenant}.db')
+
+def tenant_exists(app, tenant):
+    if tenant == DEFAULT_TENANT:
+        return True
+    return is_valid_tenant(tenant) and os.path.exists(tenant_db_path(app, tenant))
+
+def current_tenant():
+    """The tenant for the active context: g.tenant, then the login session"""
+    if has_app_context() and g.get('tenant'):
+        return g.tenant
+    if has_request_context() and session.get('tenant'):
+        return session['tenant']
+    return DEFAULT_TENANT
+
+def get_tenant_engine(app, tenant):
+    """Return the cached engine (and so connection pool) for a tenant"""
+    engines = app.extensions.setdefault('tenant_engines', {})
+    engine = engines.get(tenant)
+    if engine is None:
+        with _engines_lock:
+            engine = engines.get(tenant)
+            if engine is None:
+                engine = sa.create_engine(f'sqlite:///{tenant_db_path(app, tenant)}')
+                engines[tenant] = engine
+    return engine
+
+class TenantSession(Session):
+    """Routes every unbound query to the current tenant's database.
+
+    The default tenant keeps using SQLALCHEMY_DATABASE_URI, so a
+    single-tenant deployment behaves exactly as before.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            tenant = current_tenant()
+            if tenant != DEFAULT_TENANT:
+                return get_tenant_engine(current_app._get_current_object(), tenant)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class PerTenant:
+    """Lazily builds one instance of an in-memory structure per tenant"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._instances = {}
+
+    def get(self, tenant=None):
+        tenant = tenant or current_tenant()
+        instance = self._instances.get(tenant)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(tenant)
+                if instance is None:
+                    instance = self._factory()
+                    self._instances[tenant] = instance
+        return instance
+
+    def discard(self, tenant):
+        with self._lock:
+            self._instances.pop(tenant, None)
@@ -0,0 +1,97 @@
+import bisect
+import threading
+from src.models.user import User
+from src.services.tenants import PerTenant, current_tenant
+
+class UserPrefixIndex:
+    """Sorted (key, user_id) pairs over user names and emails.
+
+    Every word of the name and the full email are indexed, so a prefix
+    lookup is a binary search followed by a short forward scan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._users = {}  # user_id -> summary dict
+
+    def __len__(self):
+        return len(self._users)
+
+    @staticmethod
+    def _keys_for(user):
+        keys = {word for word in user['name'].lower().split()}
+        keys.add(user['name'].lower())
+        keys.add(user['email'].lower())
+        return [(key, user['id']) for key in keys]
+
+    def rebuild(self, users):
+        with self._lock:
+            self._users = {}
+            keys = []
+            for user in users:
+                summary = self._summary(user)
+                self._users[user.id] = summary
+                keys.extend(self._keys_for(summary))
+            keys.sort()
+            self._keys = keys
+
+    @staticmethod
+    def _summary(user):
+        return {'id': user.id, 'name': user.name, 'email': user.email, 'role': user.role}
+
+    def upsert(self, user):
+        with self._lock:
+            self._remove_locked(user.id)
+            summary = self._summary(user)
+            self._users[user.id] = summary
+            for key in self._keys_for(summary):
+                bisect.insort(self._keys, key)
+
+    def remove(self, user_id):
+        with self._lock:
+            self._remove_locked(user_id)
+
+    def _remove_locked(self, user_id):
+        summary = self._users.pop(user_id, None)
+        if not summary:
+            return
+        for key in self._keys_for(summary):
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def search(self, prefix, roles=None, limit=10):
+        prefix = prefix.lower()
+        results = []
+        seen = set()
+        with self._lock:
+            i = bisect.bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(results) < limit:
+                key, user_id = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                i += 1
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                user = self._users[user_id]
+                if roles and user['role'] not in roles:
+                    continue
+                results.append(dict(user))
+        return results
+
+def _build_index():
+    index = UserPrefixIndex()
+    index.rebuild(User.query.yield_per(1000))
+    return index
+
+# One index per tenant, built from that tenant's database on first use
+user_indexes = PerTenant(_build_index)
+
+def get_user_index():
+    return user_indexes.get()
+
+def rebuild_user_index():
+    user_indexes.discard(current_tenant())
+    return len(get_user_index())
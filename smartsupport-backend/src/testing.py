@@ -0,0 +1,63 @@
+"""Helpers for fast route tests.
+
+Importing src.main creates the schema and seeds default data. In test mode
+that happens once per process against an in-memory database with cheap
+password hashes; the result is kept as a template and copied back with
+SQLite's backup API before each test, which takes milliseconds.
+
+Typical pytest usage::
+
+    from src.testing import create_test_app
+
+    app, template = create_test_app()
+
+    @pytest.fixture
+    def client():
+        template.restore()
+        return app.test_client()
+
+Each pytest-xdist worker is its own process, so it gets its own in-memory
+database and the suite can run in parallel.
+"""
+import os
+import sqlite3
+from src.models.user import db
+from src.services.duplicates import rebuild_index
+from src.services.user_index import rebuild_user_index
+
+TEST_DATABASE_URI = 'sqlite://'
+
+class DatabaseTemplate:
+    """An in-memory snapshot of the app database that can be restored"""
+
+    def __init__(self, app):
+        self.app = app
+        self._snapshot = sqlite3.connect(':memory:', check_same_thread=False)
+        with app.app_context():
+            with db.engine.connect() as connection:
+                connection.connection.dbapi_connection.backup(self._snapshot)
+
+    def restore(self):
+        with self.app.app_context():
+            db.session.remove()
+            with db.engine.connect() as connection:
+                self._snapshot.backup(connection.connection.dbapi_connection)
+            # In-memory indexes must match the restored rows
+            rebuild_index()
+            rebuild_user_index()
+
+def create_test_app():
+    """Import the app in test mode and snapshot its seeded database.
+
+    Must run before anything else imports src.main, since the database is
+    configured at import time. The database is always in memory: restore()
+    overwrites it before every test, so a URI exported in the shell must
+    never be used here.
+    """
+    os.environ['SMARTSUPPORT_TESTING'] = '1'
+    os.environ['SMARTSUPPORT_DATABASE_URI'] = TEST_DATABASE_URI
+    from src.main import app  # configured from the environment at import
+    if app.config['SQLALCHEMY_DATABASE_URI'] != TEST_DATABASE_URI:
+        raise RuntimeError('src.main was imported before create_test_app(); refusing to overwrite '
+                           + app.config['SQLALCHEMY_DATABASE_URI'])
+    return app, DatabaseTemplate(app)
@@ -0,0 +1,29 @@
+import pytest
+from src.testing import create_test_app
+
+# Must come before anything else imports src.main
+app, template = create_test_app()
+
+@pytest.fixture
+def client():
+    """A test client against a fresh copy of the seeded database"""
+    template.restore()
+    return app.test_client()
+
+@pytest.fixture
+def login(client):
+    """Return a function that signs in and returns a client with its own session"""
+    def login(email='admin@smartsupport.com', password='admin123', organization=None):
+        user_client = app.test_client()
+        data = {'email': email, 'password': password}
+        if organization:
+            data['organization'] = organization
+        response = user_client.post('/api/auth/login', json=data)
+        assert response.status_code == 200, response.get_json()
+        return user_client
+    return login
+
+@pytest.fixture
+def app_context(client):
+    with app.app_context():
+        yield app
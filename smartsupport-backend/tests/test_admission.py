@@ -0,0 +1,48 @@
+import pytest
+from tests.conftest import app
+
+@pytest.fixture
+def admission(monkeypatch):
+    """Admission on, with small buckets that do not refill during a test"""
+    controller = app.extensions['admission']
+    monkeypatch.setitem(app.config, 'ADMISSION_ENABLED', True)
+    monkeypatch.setattr(controller, 'rates', {
+        'expensive': (0.001, 2),
+        'read': (0.001, 3),
+        'write': (0.001, 3)
+    })
+    monkeypatch.setattr(controller, '_buckets', {})
+    return controller
+
+def test_rate_limited_requests_get_429(login, admission):
+    admin = login()
+    statuses = [admin.get('/api/tickets').status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+    response = admin.get('/api/tickets')
+    assert response.get_json()['reason'] == 'rate_limited'
+    assert int(response.headers['Retry-After']) >= 1
+
+    # Cheap reads have their own bucket
+    assert admin.get('/api/admin/categories').status_code == 200
+
+def test_clients_have_separate_buckets(login, admission):
+    admin = login()
+    agent = login('agent@smartsupport.com', 'agent123')
+    for _ in range(2):
+        admin.get('/api/tickets')
+    assert admin.get('/api/tickets').status_code == 429
+    assert agent.get('/api/tickets').status_code == 200
+
+def test_batch_sub_requests_are_charged(login, admission):
+    admin = login()
+    response = admin.post('/api/batch', json={'requests': [{'path': '/api/tickets'}] * 3})
+    assert response.status_code == 200
+    assert [r['status'] for r in response.get_json()['responses']] == [200, 200, 429]
+
+def test_saturated_expensive_requests_are_shed(login, admission, monkeypatch):
+    admin = login()
+    monkeypatch.setattr(admission, '_in_flight', admission.expensive_limit)
+    response = admin.get('/api/tickets')
+    assert response.status_code == 429
+    assert response.get_json()['reason'] == 'saturated'
@@ -0,0 +1,101 @@
+import hashlib
+import os
+from src.routes import tickets
+from src.services.attachments import blob_path, sweep_orphan_blobs
+from tests.conftest import app
+
+CONTENT = bytes(range(256)) * 40
+
+def create_ticket(client, subject='Attachment ticket'):
+    return client.post('/api/tickets', json={'subject': subject}).get_json()['ticket']['id']
+
+def upload(client, ticket_id, data, file_name='log.bin'):
+    return client.post(
+        f'/api/tickets/{ticket_id}/attachments?file_name={file_name}',
+        data=data,
+        content_type='application/octet-stream'
+    )
+
+def test_upload_and_download(login):
+    user = login('user@example.com', 'user123')
+    ticket_id = create_ticket(user)
+
+    response = upload(user, ticket_id, CONTENT)
+    assert response.status_code == 201
+    attachment = response.get_json()['attachment']
+    assert attachment['size'] == len(CONTENT)
+
+    response = user.get(attachment['file_url'])
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers['ETag'].strip('"') == hashlib.sha256(CONTENT).hexdigest()
+
+def test_range_download(login):
+    user = login('user@example.com', 'user123')
+    ticket_id = create_ticket(user)
+    file_url = upload(user, ticket_id, CONTENT).get_json()['attachment']['file_url']
+
+    response = user.get(file_url, headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206
+    assert response.data == CONTENT[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(CONTENT)}'
+
+    response = user.get(file_url, headers={'Range': f'bytes={len(CONTENT)}-'})
+    assert response.status_code == 416
+
+def test_other_users_cannot_upload_or_download(login):
+    admin = login()
+    ticket_id = create_ticket(admin)
+    file_url = upload(admin, ticket_id, CONTENT).get_json()['attachment']['file_url']
+
+    user = login('user@example.com', 'user123')
+    assert upload(user, ticket_id, CONTENT).status_code == 403
+    assert user.get(file_url).status_code == 403
+
+def test_quota_is_enforced(login, monkeypatch):
+    monkeypatch.setitem(app.config, 'ATTACHMENT_QUOTA_BYTES', len(CONTENT) + 10)
+    user = login('user@example.com', 'user123')
+    ticket_id = create_ticket(user)
+
+    assert upload(user, ticket_id, CONTENT).status_code == 201
+    assert upload(user, ticket_id, b'x' * 20).status_code == 413
+    attachments = user.get(f'/api/tickets/{ticket_id}/attachments').get_json()['attachments']
+    assert len(attachments) == 1
+
+def test_rejected_upload_blob_is_left_for_the_sweep(login, app_context, monkeypatch):
+    monkeypatch.setitem(app.config, 'ATTACHMENT_QUOTA_BYTES', len(CONTENT) + 10)
+    user = login('user@example.com', 'user123')
+    ticket_id = create_ticket(user)
+    assert upload(user, ticket_id, CONTENT).status_code == 201
+
+    # As if a concurrent upload committed after the check before streaming
+    calls = []
+    real_attachment_bytes = tickets._attachment_bytes
+    def attachment_bytes(ticket_id):
+        calls.append(ticket_id)
+        return 0 if len(calls) == 1 else real_attachment_bytes(ticket_id)
+    monkeypatch.setattr(tickets, '_attachment_bytes', attachment_bytes)
+    orphan = b'y' * 20
+    orphan_sha = hashlib.sha256(orphan).hexdigest()
+    assert upload(user, ticket_id, orphan).status_code == 413
+    monkeypatch.undo()
+    assert os.path.exists(blob_path(orphan_sha))
+
+    # Recent blobs may belong to uploads that are still committing
+    assert sweep_orphan_blobs() == 0
+    assert sweep_orphan_blobs(min_age_seconds=-1) == 1
+    assert not os.path.exists(blob_path(orphan_sha))
+    assert os.path.exists(blob_path(hashlib.sha256(CONTENT).hexdigest()))
+
+def test_reused_blob_is_not_swept(login, app_context):
+    user = login('user@example.com', 'user123')
+    assert upload(user, create_ticket(user), CONTENT).status_code == 201
+    path = blob_path(hashlib.sha256(CONTENT).hexdigest())
+    os.utime(path, (0, 0))
+
+    # Deduplicating against the blob refreshes it, so an upload that reuses
+    # an orphan is safe from the sweep until it commits
+    assert upload(user, create_ticket(user), CONTENT).status_code == 201
+    assert os.path.getmtime(path) > 0
+    assert sweep_orphan_blobs() == 0
+    assert os.path.exists(path)
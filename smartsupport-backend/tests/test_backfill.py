@@ -0,0 +1,74 @@
+import json
+from src.models.user import db, BackfillCheckpoint, SLAPolicy
+from src.services.backfill import run_backfill
+from tests.conftest import app
+
+def add_policies():
+    policies = [
+        SLAPolicy(name='Unsorted', escalation_policy=json.dumps({'levels': [
+            {'time_minutes': 60, 'action': 'b'}, {'time_minutes': 10, 'action': 'a'}
+        ], 'owner': 'ops'})),
+        SLAPolicy(name='Bare list', escalation_policy=json.dumps([{'time_minutes': 30}, 'note', {'time_minutes': 5}])),
+        SLAPolicy(name='Broken', escalation_policy='{not json'),
+        SLAPolicy(name='Bad levels', escalation_policy=json.dumps({'levels': 'soon'})),
+        SLAPolicy(name='Empty')
+    ]
+    db.session.add_all(policies)
+    db.session.commit()
+    return {policy.name: policy.id for policy in policies}
+
+def policy(policy_id):
+    return db.session.get(SLAPolicy, policy_id).escalation_policy
+
+def test_checkpoint_resumes_where_the_last_run_stopped(app_context):
+    ids = add_policies()
+    total = SLAPolicy.query.count()
+
+    checkpoint = run_backfill('sla-escalation-policies', batch_size=2, throttle=0, max_batches=1)
+    assert checkpoint.rows_processed == 2
+    assert checkpoint.completed_at is None
+    paused_at = checkpoint.last_id
+
+    seen = []
+    checkpoint = run_backfill(
+        'sla-escalation-policies', batch_size=2, throttle=0,
+        progress=lambda checkpoint, done, pending: seen.append((checkpoint.last_id, done, pending))
+    )
+    assert checkpoint.completed_at is not None
+    assert checkpoint.rows_processed == total
+    assert seen[0][0] > paused_at
+    assert seen[-1][1:] == (total - 2, total - 2)
+
+    assert json.loads(policy(ids['Unsorted'])) == {'levels': [
+        {'time_minutes': 10, 'action': 'a'}, {'time_minutes': 60, 'action': 'b'}
+    ], 'owner': 'ops'}
+    assert json.loads(policy(ids['Bare list'])) == {'levels': [{'time_minutes': 5}, {'time_minutes': 30}, 'note']}
+
+def test_rows_that_cannot_migrate_are_skipped_and_counted(app_context):
+    ids = add_policies()
+    checkpoint = run_backfill('sla-escalation-policies', batch_size=100, throttle=0)
+    assert checkpoint.rows_skipped == 2
+    assert policy(ids['Broken']) == '{not json'
+    assert json.loads(policy(ids['Bad levels'])) == {'levels': 'soon'}
+
+    # Restarting reprocesses every row and counts from zero
+    checkpoint = run_backfill('sla-escalation-policies', batch_size=100, throttle=0, restart=True)
+    assert checkpoint.rows_skipped == 2
+    assert checkpoint.rows_processed == SLAPolicy.query.count()
+
+def test_cli_max_batches_pauses_and_reports(app_context):
+    add_policies()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['backfill', 'run', 'sla-escalation-policies', '--batch-size', '2', '--throttle', '0', '--max-batches', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'paused at id' in result.output
+
+    result = runner.invoke(args=['backfill', 'run', 'sla-escalation-policies', '--batch-size', '2', '--throttle', '0'])
+    assert result.exit_code == 0, result.output
+    assert 'completed' in result.output
+    assert '2 rows skipped' in result.output
+
+    db.session.expire_all()
+    checkpoint = db.session.get(BackfillCheckpoint, 'sla-escalation-policies')
+    assert checkpoint.rows_processed == SLAPolicy.query.count()
@@ -0,0 +1,38 @@
+def test_batch_runs_each_get(login):
+    admin = login()
+    ticket_id = admin.post('/api/tickets', json={'subject': 'Batched'}).get_json()['ticket']['id']
+
+    response = admin.post('/api/batch', json={'requests': [
+        {'path': f'/api/tickets/{ticket_id}'},
+        {'path': '/api/admin/categories'},
+        {'path': '/api/tickets/999999'}
+    ]})
+    assert response.status_code == 200
+    responses = response.get_json()['responses']
+    assert [r['status'] for r in responses] == [200, 200, 404]
+    assert responses[0]['body']['ticket']['subject'] == 'Batched'
+
+def test_batch_sub_requests_keep_the_caller_permissions(login):
+    user = login('user@example.com', 'user123')
+    responses = user.post('/api/batch', json={'requests': [
+        {'path': '/api/admin/users'}
+    ]}).get_json()['responses']
+    assert responses[0]['status'] == 403
+
+def test_batch_rejects_invalid_entries(login):
+    admin = login()
+    responses = admin.post('/api/batch', json={'requests': [
+        'not-an-object',
+        {'path': 42},
+        {'path': '/api/tickets', 'method': 'POST'},
+        {'path': '/api/batch'},
+        {'path': '/not-api'}
+    ]}).get_json()['responses']
+    assert [r['status'] for r in responses] == [400, 400, 405, 400, 400]
+
+def test_batch_validates_the_request_list(login, client):
+    assert client.post('/api/batch', json={'requests': [{'path': '/api/tickets'}]}).status_code == 401
+
+    admin = login()
+    assert admin.post('/api/batch', json={'requests': []}).status_code == 400
+    assert admin.post('/api/batch', json={'requests': [{'path': '/api/tickets'}] * 11}).status_code == 400
@@ -0,0 +1,55 @@
+from src.models.user import TicketStatus
+from src.services.duplicates import DuplicateIndex
+
+SUBJECT = 'Reset password portal not loading'
+DESCRIPTION = 'The reset password portal shows a blank page after I enter my email address in Chrome'
+
+def test_add_query_remove():
+    index = DuplicateIndex()
+    index.add(1, SUBJECT, DESCRIPTION, created_by=10)
+    index.add(2, 'Invoice PDF missing', 'The March invoice has no PDF attached to the email', created_by=11)
+    assert len(index) == 2
+
+    matches = index.query('Password reset portal not loading', DESCRIPTION)
+    assert [match['id'] for match in matches] == [1]
+    assert matches[0]['subject'] == SUBJECT
+    assert matches[0]['similarity'] >= 0.5
+
+    assert index.query('Password reset portal not loading', DESCRIPTION, created_by=11) == []
+    assert index.query(SUBJECT, DESCRIPTION, exclude_id=1) == []
+
+    index.remove(1)
+    assert len(index) == 1
+    assert index.query(SUBJECT, DESCRIPTION) == []
+    assert not any(1 in bucket for bucket in index._buckets.values())
+
+def test_subject_only_query_matches_while_typing():
+    index = DuplicateIndex()
+    index.add(1, SUBJECT, DESCRIPTION, created_by=10)
+
+    for description in (None, '', '   '):
+        matches = index.query('reset password portal', description)
+        assert [match['id'] for match in matches] == [1]
+
+def test_re_adding_replaces_the_old_signatures():
+    index = DuplicateIndex()
+    index.add(1, SUBJECT, DESCRIPTION, created_by=10)
+    index.add(1, 'Invoice PDF missing', 'The March invoice has no PDF attached', created_by=10)
+    assert len(index) == 1
+    assert index.query('reset password portal', None) == []
+    assert [match['id'] for match in index.query('invoice pdf missing', None)] == [1]
+
+def test_resolved_tickets_leave_the_index(login, app_context):
+    user = login('user@example.com', 'user123')
+    admin = login()
+    ticket_id = user.post('/api/tickets', json={'subject': SUBJECT, 'description': DESCRIPTION}).get_json()['ticket']['id']
+
+    response = user.post('/api/tickets', json={'subject': 'Password reset portal not loading', 'description': DESCRIPTION})
+    assert [match['id'] for match in response.get_json()['possible_duplicates']] == [ticket_id]
+    check = user.post('/api/tickets/duplicates', json={'subject': 'reset password portal'}).get_json()
+    assert ticket_id in [match['id'] for match in check['possible_duplicates']]
+
+    resolved_id = TicketStatus.query.filter_by(name='Resolved').one().id
+    admin.put(f'/api/tickets/{ticket_id}', json={'status': resolved_id})
+    check = user.post('/api/tickets/duplicates', json={'subject': 'reset password portal'}).get_json()
+    assert ticket_id not in [match['id'] for match in check['possible_duplicates']]
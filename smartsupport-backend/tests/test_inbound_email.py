@@ -0,0 +1,84 @@
+import mailbox
+from email.message import EmailMessage
+from sqlalchemy import func, text
+from src.models.user import db, Comment, Ticket, User
+from src.services.inbound_email import import_mailbox
+
+def write_mbox(path, messages):
+    box = mailbox.mbox(str(path))
+    for sender, subject, body, message_id, in_reply_to in messages:
+        message = EmailMessage()
+        message['From'] = sender
+        message['Subject'] = subject
+        message['Message-ID'] = message_id
+        message['Date'] = 'Mon, 05 Oct 2026 10:00:00 +0000'
+        if in_reply_to:
+            message['In-Reply-To'] = in_reply_to
+            message['References'] = in_reply_to
+        message.set_content(body)
+        box.add(message)
+    box.flush()
+    box.close()
+    return str(path)
+
+def test_replies_are_threaded_onto_the_ticket(app_context, tmp_path, login):
+    path = write_mbox(tmp_path / 'inbox.mbox', [
+        ('Jane Roe <jane@example.org>', 'Cannot log in', 'Password reset fails', '<a@mail>', None),
+        ('Jane Roe <jane@example.org>', 'Re: Cannot log in', 'Still broken', '<b@mail>', '<a@mail>'),
+        ('Jane Roe <jane@example.org>', 'Re: Re: Cannot log in', 'Any news?', '<c@mail>', '<b@mail>'),
+        ('Sam <sam@example.org>', 'Invoice missing', 'Where is it?', '<d@mail>', None)
+    ])
+
+    stats = import_mailbox(path, batch_size=2)
+    assert stats['tickets'] == 2
+    assert stats['comments'] == 2
+    assert stats['users_created'] == 2
+
+    ticket = Ticket.query.filter_by(subject='Cannot log in').one()
+    comments = Comment.query.filter_by(ticket_id=ticket.id).order_by(Comment.id).all()
+    assert [comment.comment_text for comment in comments] == ['Still broken', 'Any news?']
+
+    # The thread is visible through the API like any other ticket
+    admin = login()
+    data = admin.get(f'/api/tickets/{ticket.id}').get_json()['ticket']
+    assert [comment['comment_text'] for comment in data['comments']] == ['Still broken', 'Any news?']
+
+def test_reimport_skips_messages_already_imported(app_context, tmp_path):
+    path = write_mbox(tmp_path / 'inbox.mbox', [
+        ('jane@example.org', 'Printer on fire', 'Smoke everywhere', '<p@mail>', None),
+        ('jane@example.org', 'Re: Printer on fire', 'It is out now', '<q@mail>', '<p@mail>')
+    ])
+    import_mailbox(path)
+
+    stats = import_mailbox(path)
+    assert stats['skipped'] == 2
+    assert stats['tickets'] == 0
+    assert Ticket.query.filter_by(subject='Printer on fire').count() == 1
+
+def test_existing_sender_matches_regardless_of_case(app_context, tmp_path):
+    user = User(name='John Doe', email='John.Doe@Example.com', role='End-User', password_hash='!')
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    user_count = User.query.count()
+    path = write_mbox(tmp_path / 'inbox.mbox', [
+        ('JOHN DOE <JOHN.DOE@EXAMPLE.COM>', 'Shouting', 'HELLO', '<s@mail>', None)
+    ])
+
+    stats = import_mailbox(path)
+    assert stats['users_created'] == 0
+    assert User.query.count() == user_count
+    db.session.expire_all()
+    assert Ticket.query.filter_by(subject='Shouting').one().created_by == user_id
+
+def test_sender_lookup_uses_the_lower_email_index(app_context):
+    from src.main import create_tenant_schema
+    db.session.execute(text('DROP INDEX ix_user_email_lower'))
+    db.session.commit()
+    # Existing databases get the index when the schema is migrated
+    create_tenant_schema('default')
+
+    stmt = User.query.filter(func.lower(User.email).in_(['a@example.org', 'b@example.org'])).statement
+    sql = str(stmt.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    plan = ' '.join(row[3] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+    assert 'USING INDEX ix_user_email_lower' in plan
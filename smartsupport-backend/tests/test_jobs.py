@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from src.models.user import db, Job, Notification, User
+from src.services import jobs
+
+def assign(admin, agent_id):
+    ticket_id = admin.post('/api/tickets', json={'subject': 'Needs an agent'}).get_json()['ticket']['id']
+    response = admin.put(f'/api/tickets/{ticket_id}', json={'assigned_to': agent_id})
+    assert response.status_code == 200
+    return ticket_id
+
+def test_assignment_notification_runs_as_a_job(login, app_context):
+    agent_id = User.query.filter_by(email='agent@smartsupport.com').first().id
+    ticket_id = assign(login(), agent_id)
+
+    job = Job.query.filter_by(task='notifications.ticket_assigned').one()
+    assert job.status == 'queued'
+    assert job.get_payload() == {'ticket_id': ticket_id, 'assignee_id': agent_id}
+    assert Notification.query.filter_by(recipient_id=agent_id).count() == 0
+
+    claimed = jobs.claim_jobs(10)
+    assert [claimed_job.id for claimed_job in claimed] == [job.id]
+    assert claimed[0].attempts == 1
+    assert jobs.claim_jobs(10) == []
+
+    jobs.run_job(claimed[0])
+    job = db.session.get(Job, job.id)
+    assert job.status == 'done'
+    assert job.claim_token is None
+    assert Notification.query.filter_by(recipient_id=agent_id, event_type='ticket_assigned').count() == 1
+
+def test_failing_job_is_retried_then_failed(app_context, monkeypatch):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise RuntimeError('mail server down')
+
+    monkeypatch.setitem(jobs.TASKS, 'tests.flaky', jobs.Task('tests.flaky', flaky, 2, None, timedelta(seconds=60)))
+    job = jobs.enqueue('tests.flaky')
+    db.session.commit()
+    job_id = job.id
+
+    jobs.run_job(jobs.claim_jobs(10)[0])
+    job = db.session.get(Job, job_id)
+    assert job.status == 'queued'
+    assert job.attempts == 1
+    assert job.run_at > datetime.utcnow()
+    assert 'mail server down' in job.last_error
+    assert jobs.claim_jobs(10) == []
+
+    # Due again once the backoff has passed
+    job.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    jobs.run_job(jobs.claim_jobs(10)[0])
+    job = db.session.get(Job, job_id)
+    assert job.status == 'failed'
+    assert job.attempts == 2
+    assert job.finished_at is not None
+    assert len(calls) == 2
+
+def test_job_with_expired_lease_is_claimed_again(app_context, monkeypatch):
+    monkeypatch.setitem(jobs.TASKS, 'tests.noop', jobs.Task('tests.noop', lambda: None, 2, None, timedelta(seconds=60)))
+    job = jobs.enqueue('tests.noop')
+    db.session.commit()
+    job_id = job.id
+
+    first = jobs.claim_jobs(10)[0]
+    first_token = first.claim_token
+    assert jobs.claim_jobs(10) == []
+
+    # The worker died: nothing finishes the job before its lease runs out
+    first.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    second = jobs.claim_jobs(10)
+    assert [job.id for job in second] == [job_id]
+    assert second[0].claim_token != first_token
+    assert second[0].attempts == 2
+
+    # Out of attempts, so the next expiry fails it instead of retrying
+    second[0].lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert jobs.claim_jobs(10) == []
+    job = db.session.get(Job, job_id)
+    assert job.status == 'failed'
+    assert 'Lease expired' in job.last_error
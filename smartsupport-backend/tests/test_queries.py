@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime
+from src.models.queries import DEFAULT_PER_PAGE, MAX_PER_PAGE, page_args, page_tickets, ticket_counts
+from src.models.user import db, Category, Ticket, TicketStatus, User
+
+@pytest.mark.parametrize('page, per_page, expected', [
+    (1, 10, (1, 10)),
+    (3, 25, (3, 25)),
+    (0, 10, (1, 10)),
+    (-5, 10, (1, 10)),
+    (None, None, (1, DEFAULT_PER_PAGE)),
+    (2, 0, (2, DEFAULT_PER_PAGE)),
+    (2, -1, (2, DEFAULT_PER_PAGE)),
+    (1, 10000, (1, MAX_PER_PAGE))
+])
+def test_page_args(page, per_page, expected):
+    assert page_args(page, per_page) == expected
+
+@pytest.fixture
+def tickets(app_context):
+    users = {user.email: user for user in User.query.all()}
+    other_agent = User(name='Other Agent', email='l1@smartsupport.com', role='L1')
+    other_agent.set_password('l1')
+    db.session.add(other_agent)
+    db.session.flush()
+    open_id = TicketStatus.query.filter_by(name='Open').one().id
+    closed_id = TicketStatus.query.filter_by(name='Closed').one().id
+    category_id = Category.query.first().id
+    end_user = users['user@example.com'].id
+    agent = users['agent@smartsupport.com'].id
+
+    rows = [
+        # subject, created_by, assigned_to, priority, status, category
+        ('mine unassigned', end_user, None, 'High', open_id, category_id),
+        ('mine assigned', end_user, agent, 'Low', closed_id, None),
+        ('admin assigned other', users['admin@smartsupport.com'].id, other_agent.id, 'High', open_id, category_id),
+        ('admin unassigned', users['admin@smartsupport.com'].id, None, 'Low', open_id, None)
+    ]
+    for day, (subject, created_by, assigned_to, priority, status, category) in enumerate(rows, start=1):
+        db.session.add(Ticket(subject=subject, created_by=created_by, assigned_to=assigned_to,
+                              priority=priority, status=status, category_id=category,
+                              created_at=datetime(2026, 1, day)))
+    db.session.commit()
+    return {
+        'users': users, 'other_agent': other_agent, 'open_id': open_id,
+        'closed_id': closed_id, 'category_id': category_id
+    }
+
+def subjects(result):
+    return sorted(ticket.subject for ticket in result[0])
+
+def test_page_tickets_role_visibility(tickets):
+    users = tickets['users']
+    assert subjects(page_tickets(users['admin@smartsupport.com'], 1, 10)) == [
+        'admin assigned other', 'admin unassigned', 'mine assigned', 'mine unassigned'
+    ]
+    assert subjects(page_tickets(users['user@example.com'], 1, 10)) == ['mine assigned', 'mine unassigned']
+    assert subjects(page_tickets(users['agent@smartsupport.com'], 1, 10)) == [
+        'admin unassigned', 'mine assigned', 'mine unassigned'
+    ]
+    assert subjects(page_tickets(tickets['other_agent'], 1, 10)) == [
+        'admin assigned other', 'admin unassigned', 'mine unassigned'
+    ]
+
+def test_page_tickets_filters_combine_with_roles(tickets):
+    users = tickets['users']
+    admin = users['admin@smartsupport.com']
+    assert subjects(page_tickets(admin, 1, 10, priority='High')) == ['admin assigned other', 'mine unassigned']
+    assert subjects(page_tickets(admin, 1, 10, status=tickets['closed_id'])) == ['mine assigned']
+    assert subjects(page_tickets(admin, 1, 10, priority='High', category_id=tickets['category_id'])) == [
+        'admin assigned other', 'mine unassigned'
+    ]
+    assert subjects(page_tickets(users['agent@smartsupport.com'], 1, 10, priority='High')) == ['mine unassigned']
+    assert subjects(page_tickets(users['user@example.com'], 1, 10, status=tickets['open_id'], priority='Low')) == []
+
+    total, by_status, by_priority = ticket_counts(users['user@example.com'])
+    assert total == 2
+    assert by_priority == {'High': 1, 'Low': 1}
+
+def test_page_tickets_clamps_and_pages(tickets):
+    admin = tickets['users']['admin@smartsupport.com']
+    _, total, page, per_page = page_tickets(admin, 0, 0)
+    assert (total, page, per_page) == (4, 1, DEFAULT_PER_PAGE)
+
+    pages = [[ticket.subject for ticket in page_tickets(admin, page, 3)[0]] for page in (1, 2, 3)]
+    assert pages == [['admin unassigned', 'admin assigned other', 'mine assigned'], ['mine unassigned'], []]
+
+def test_ticket_list_route_echoes_clamped_arguments(login, tickets):
+    admin = login()
+    data = admin.get('/api/tickets?page=-2&per_page=500').get_json()
+    assert (data['current_page'], data['per_page'], data['total'], data['pages']) == (1, MAX_PER_PAGE, 4, 1)
+
+    data = login('user@example.com', 'user123').get('/api/tickets?priority=High').get_json()
+    assert [ticket['subject'] for ticket in data['tickets']] == ['mine unassigned']
@@ -0,0 +1,65 @@
+import json
+from datetime import date, datetime
+import pytest
+from sqlalchemy import text
+from src.models.user import db
+from src.services.slow_queries import SlowQueryLog, redact_parameters
+from tests.conftest import app
+
+def test_redaction_keeps_ids_and_hides_text():
+    assert redact_parameters({'id': 7, 'flag': True, 'score': 1.5, 'missing': None}) == {
+        'id': 7, 'flag': True, 'score': 1.5, 'missing': None
+    }
+    assert redact_parameters(('secret@example.com', b'\x00\x01', date(2026, 1, 2))) == [
+        '<str len=18>', '<bytes len=2>', '2026-01-02'
+    ]
+    assert redact_parameters({'at': datetime(2026, 1, 2, 3, 4)}) == {'at': '2026-01-02T03:04:00'}
+    assert redact_parameters([('a', 1), ('bb', 2), ('ccc', 3)]) == {'rows': 3, 'first': ['<str len=1>', 1]}
+    assert redact_parameters({1, 2}) == '<set>'
+
+@pytest.fixture
+def slow_queries(app_context, tmp_path, monkeypatch):
+    """Record every statement, into a log file under tmp_path"""
+    log = SlowQueryLog(threshold_ms=0, log_path=str(tmp_path / 'slow.log'))
+    monkeypatch.setitem(app.extensions, 'slow_queries', log)
+    yield log
+    for handler in list(log.logger.handlers):
+        log.logger.removeHandler(handler)
+        handler.close()
+
+def test_full_scans_are_detected(slow_queries):
+    db.session.execute(text('SELECT * FROM ticket WHERE subject = :subject'), {'subject': 'password reset'}).all()
+    scan = slow_queries.recent(limit=1)[0]
+    assert scan['scanned_tables'] == ['ticket']
+    assert scan['parameters'] == ['<str len=14>']
+    assert 'password reset' not in json.dumps(scan)
+    assert any(row['detail'].startswith('SCAN ticket') for row in scan['plan'])
+
+    db.session.execute(text('SELECT * FROM user WHERE id = :id'), {'id': 1}).all()
+    lookup = slow_queries.recent(limit=1)[0]
+    assert lookup['scanned_tables'] == []
+    assert lookup['parameters'] == [1]
+
+    assert scan in slow_queries.recent(scans_only=True)
+    assert lookup not in slow_queries.recent(scans_only=True)
+
+def test_entries_are_written_as_json_lines(slow_queries, tmp_path):
+    db.session.execute(text('SELECT * FROM category WHERE name = :name'), {'name': 'Billing'}).all()
+    lines = (tmp_path / 'slow.log').read_text().splitlines()
+    entries = [json.loads(line) for line in lines]
+    assert any(entry['scanned_tables'] == ['category'] for entry in entries)
+    assert all(entry['tenant'] == 'default' for entry in entries)
+    assert 'Billing' not in ''.join(lines)
+
+def test_route_records_request_details_and_clamps_limit(login, slow_queries):
+    admin = login()
+    admin.get('/api/tickets')
+
+    data = admin.get('/api/admin/slow-queries?limit=-1').get_json()
+    assert data['threshold_ms'] == 0
+    assert len(data['queries']) == 1
+    routes = [entry['route'] for entry in slow_queries.recent(limit=200)]
+    assert '/api/tickets' in routes
+
+    assert admin.delete('/api/admin/slow-queries').status_code == 200
+    assert slow_queries.recent() == []
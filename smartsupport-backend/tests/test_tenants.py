@@ -0,0 +1,86 @@
+import os
+import uuid
+from src.services.tenants import tenant_exists
+from tests.conftest import app
+
+def create_tenant(admin_email='admin@acme.test', admin_password='acme-pass'):
+    tenant = f'acme-{uuid.uuid4().hex[:8]}'
+    result = app.test_cli_runner().invoke(args=[
+        'tenant-create', tenant,
+        '--admin-email', admin_email,
+        '--admin-password', admin_password
+    ])
+    assert result.exit_code == 0, result.output
+    return tenant
+
+def test_tickets_are_isolated_between_tenants(login):
+    tenant = create_tenant()
+    default_admin = login()
+    tenant_admin = login('admin@acme.test', 'acme-pass', organization=tenant)
+
+    default_admin.post('/api/tickets', json={'subject': 'Default printer jam'})
+    tenant_admin.post('/api/tickets', json={'subject': 'Acme VPN down'})
+
+    default_subjects = [t['subject'] for t in default_admin.get('/api/tickets').get_json()['tickets']]
+    tenant_subjects = [t['subject'] for t in tenant_admin.get('/api/tickets').get_json()['tickets']]
+    assert 'Default printer jam' in default_subjects
+    assert 'Acme VPN down' not in default_subjects
+    assert tenant_subjects == ['Acme VPN down']
+
+def test_users_only_sign_in_to_their_own_tenant(client):
+    tenant = create_tenant()
+
+    response = client.post('/api/auth/login', json={
+        'email': 'admin@smartsupport.com', 'password': 'admin123', 'organization': tenant
+    })
+    assert response.status_code == 401
+
+    response = client.post('/api/auth/login', json={
+        'email': 'admin@smartsupport.com', 'password': 'admin123', 'organization': 'no-such-org'
+    })
+    assert response.status_code == 401
+
+def test_user_search_is_isolated_between_tenants(login):
+    tenant = create_tenant()
+    tenant_admin = login('admin@acme.test', 'acme-pass', organization=tenant)
+
+    users = tenant_admin.get('/api/admin/users/search?q=admin').get_json()['users']
+    assert [user['email'] for user in users] == ['admin@acme.test']
+
+def test_export_and_import_move_attachments_with_the_tenant(login, tmp_path):
+    tenant = create_tenant()
+    admin = login('admin@acme.test', 'acme-pass', organization=tenant)
+    ticket_id = admin.post('/api/tickets', json={'subject': 'With a log'}).get_json()['ticket']['id']
+    admin.post(f'/api/tickets/{ticket_id}/attachments?file_name=log.txt', data=b'log line\n' * 100)
+
+    runner = app.test_cli_runner()
+    dest = str(tmp_path / 'acme.db')
+    result = runner.invoke(args=['tenant-export', tenant, dest])
+    assert result.exit_code == 0, result.output
+    assert '1 attachment blobs' in result.output
+
+    moved = f'{tenant}-moved'
+    result = runner.invoke(args=['tenant-import', moved, dest])
+    assert result.exit_code == 0, result.output
+
+    moved_admin = login('admin@acme.test', 'acme-pass', organization=moved)
+    attachment = moved_admin.get(f'/api/tickets/{ticket_id}/attachments').get_json()['attachments'][0]
+    response = moved_admin.get(attachment['file_url'])
+    assert response.status_code == 200
+    assert response.data == b'log line\n' * 100
+
+def test_import_refuses_attachments_without_their_archive(login, tmp_path):
+    tenant = create_tenant()
+    admin = login('admin@acme.test', 'acme-pass', organization=tenant)
+    ticket_id = admin.post('/api/tickets', json={'subject': 'With a log'}).get_json()['ticket']['id']
+    admin.post(f'/api/tickets/{ticket_id}/attachments?file_name=log.txt', data=b'log')
+
+    runner = app.test_cli_runner()
+    dest = tmp_path / 'acme.db'
+    assert runner.invoke(args=['tenant-export', tenant, str(dest)]).exit_code == 0
+    os.remove(f'{dest}.attachments.tar')
+
+    result = runner.invoke(args=['tenant-import', f'{tenant}-moved', str(dest)])
+    assert result.exit_code != 0
+    assert 'attachments.tar is missing' in result.output
+    assert not tenant_exists(app, f'{tenant}-moved')
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+from src.services.user_index import UserPrefixIndex
+
+def make_user(user_id, name, email, role='End-User'):
+    return SimpleNamespace(id=user_id, name=name, email=email, role=role)
+
+def ids(results):
+    return [user['id'] for user in results]
+
+def test_prefix_search_over_names_and_emails():
+    index = UserPrefixIndex()
+    index.rebuild([
+        make_user(1, 'Ada Lovelace', 'ada@example.com', 'Agent'),
+        make_user(2, 'Alan Turing', 'alan@example.com', 'Admin'),
+        make_user(3, 'Grace Hopper', 'grace@navy.mil')
+    ])
+    assert len(index) == 3
+    assert ids(index.search('a')) == [1, 2]
+    assert ids(index.search('TUR')) == [2]
+    assert ids(index.search('grace@navy')) == [3]
+    assert ids(index.search('ada lo')) == [1]
+    assert index.search('zz') == []
+    assert ids(index.search('a', limit=1)) == [1]
+
+def test_upsert_replaces_old_keys():
+    index = UserPrefixIndex()
+    index.rebuild([make_user(1, 'Ada Lovelace', 'ada@example.com')])
+    index.upsert(make_user(1, 'Ada Byron', 'countess@example.com'))
+    index.upsert(make_user(2, 'Bob Lovelace', 'bob@example.com'))
+
+    assert len(index) == 2
+    assert ids(index.search('lovelace')) == [2]
+    assert ids(index.search('byron')) == [1]
+    assert index.search('ada@') == []
+    assert index.search('countess')[0]['name'] == 'Ada Byron'
+
+def test_remove():
+    index = UserPrefixIndex()
+    index.rebuild([make_user(1, 'Ada Lovelace', 'ada@example.com'), make_user(2, 'Ada Byron', 'byron@example.com')])
+    index.remove(1)
+    index.remove(99)
+    assert len(index) == 1
+    assert ids(index.search('ada')) == [2]
+    assert all(user_id != 1 for _, user_id in index._keys)
+
+def test_role_filter_skips_without_using_up_the_limit():
+    index = UserPrefixIndex()
+    index.rebuild([make_user(i, f'Sam {i}', f'sam{i}@example.com') for i in range(1, 6)]
+                  + [make_user(6, 'Sam Agent', 'sam.agent@example.com', 'L2')])
+    assert ids(index.search('sam', roles={'L1', 'L2'}, limit=1)) == [6]
+
+def test_search_route_follows_user_changes(login):
+    admin = login()
+    users = admin.get('/api/admin/users/search?q=john').get_json()['users']
+    assert [user['email'] for user in users] == ['user@example.com']
+    user_id = users[0]['id']
+
+    admin.put(f'/api/admin/users/{user_id}', json={'name': 'Johanna Smith'})
+    assert admin.get('/api/admin/users/search?q=smith').get_json()['users'][0]['id'] == user_id
+    assert admin.get('/api/admin/users/search?q=doe').get_json()['users'] == []
+
+    response = admin.get('/api/admin/users/search?q=a&role=Agent&limit=-1')
+    assert response.status_code == 200
+    assert [user['email'] for user in response.get_json()['users']] == ['agent@smartsupport.com']
+
+    assert login('user@example.com', 'user123').get('/api/admin/users/search?q=a').status_code == 403
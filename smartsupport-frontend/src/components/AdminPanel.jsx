@@ -49,11 +49,28 @@ const AdminPanel = () => {
   const [success, setSuccess] = useState(null);
 
   useEffect(() => {
-    loadUsers();
-    loadStatuses();
-    loadCategories();
+    loadInitialData();
   }, []);
 
+  const loadInitialData = async () => {
+    try {
+      const [usersResponse, statusesResponse, categoriesResponse] = await apiService.batch([
+        '/admin/users',
+        '/admin/ticket-statuses',
+        '/admin/categories'
+      ]);
+      setUsers(usersResponse.users);
+      setStatuses(statusesResponse.statuses);
+      setCategories(categoriesResponse.categories);
+    } catch (error) {
+      setError('Failed to load admin data');
+    } finally {
+      setUsersLoading(false);
+      setStatusesLoading(false);
+      setCategoriesLoading(false);
+    }
+  };
+
   const loadUsers = async () => {
     try {
       setUsersLoading(true);
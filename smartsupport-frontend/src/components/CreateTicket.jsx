@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { useNavigate } from 'react-router-dom';
+import { useNavigate, Link } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
 import apiService from '../lib/api';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
@@ -25,11 +25,31 @@ const CreateTicket = () => {
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [possibleDuplicates, setPossibleDuplicates] = useState([]);
 
   useEffect(() => {
     loadCategories();
   }, []);
 
+  useEffect(() => {
+    if (!formData.subject.trim()) {
+      setPossibleDuplicates([]);
+      return;
+    }
+
+    // Debounce so the check runs once the user pauses typing
+    const timer = setTimeout(async () => {
+      try {
+        const response = await apiService.checkDuplicateTickets(formData.subject, formData.description);
+        setPossibleDuplicates(response.possible_duplicates);
+      } catch (error) {
+        console.error('Failed to check for duplicate tickets:', error);
+      }
+    }, 400);
+
+    return () => clearTimeout(timer);
+  }, [formData.subject, formData.description]);
+
   const loadCategories = async () => {
     try {
       const response = await apiService.getCategories();
@@ -134,6 +154,24 @@ const CreateTicket = () => {
                 </p>
               </div>
 
+              {possibleDuplicates.length > 0 && (
+                <Alert>
+                  <AlertCircle className="h-4 w-4" />
+                  <AlertDescription>
+                    <div className="font-medium">This looks similar to existing open tickets:</div>
+                    <ul className="mt-1 space-y-1">
+                      {possibleDuplicates.map((duplicate) => (
+                        <li key={duplicate.id}>
+                          <Link to={`/tickets/${duplicate.id}`} className="text-blue-600 hover:underline">
+                            #{duplicate.id} {duplicate.subject}
+                          </Link>
+                        </li>
+                      ))}
+                    </ul>
+                  </AlertDescription>
+                </Alert>
+              )}
+
               {/* Priority */}
               <div className="space-y-2">
                 <Label htmlFor="priority">Priority</Label>
@@ -30,15 +30,12 @@ const Dashboard = () => {
     try {
       setLoading(true);
       
-      // Load ticket statistics
-      const statsResponse = await apiService.getTicketStats();
+      // Load ticket statistics and recent tickets in one round trip
+      const [statsResponse, ticketsResponse] = await apiService.batch([
+        '/tickets/stats',
+        '/tickets?page=1&per_page=5'
+      ]);
       setStats(statsResponse);
-
-      // Load recent tickets
-      const ticketsResponse = await apiService.getTickets({ 
-        page: 1, 
-        per_page: 5 
-      });
       setRecentTickets(ticketsResponse.tickets);
     } catch (error) {
       console.error('Failed to load dashboard data:', error);
@@ -5,11 +5,12 @@ import { Input } from '@/components/ui/input';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Label } from '@/components/ui/label';
 import { Alert, AlertDescription } from '@/components/ui/alert';
-import { Ticket, Mail, Lock } from 'lucide-react';
+import { Ticket, Mail, Lock, Building2 } from 'lucide-react';
 
 const LoginPage = () => {
   const [email, setEmail] = useState('');
   const [password, setPassword] = useState('');
+  const [organization, setOrganization] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const { login, error } = useAuth();
 
@@ -18,7 +19,7 @@ const LoginPage = () => {
     setIsLoading(true);
     
     try {
-      await login(email, password);
+      await login(email, password, organization.trim() || undefined);
     } catch (error) {
       console.error('Login failed:', error);
     } finally {
@@ -65,6 +66,21 @@ const LoginPage = () => {
                 </Alert>
               )}
               
+              <div className="space-y-2">
+                <Label htmlFor="organization">Organization</Label>
+                <div className="relative">
+                  <Building2 className="absolute left-3 top-3 h-4 w-4 text-gray-400" />
+                  <Input
+                    id="organization"
+                    type="text"
+                    placeholder="Leave empty for the default organization"
+                    value={organization}
+                    onChange={(e) => setOrganization(e.target.value)}
+                    className="pl-10"
+                  />
+                </div>
+              </div>
+              
               <div className="space-y-2">
                 <Label htmlFor="email">Email</Label>
                 <div className="relative">
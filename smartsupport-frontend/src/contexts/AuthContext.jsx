@@ -32,10 +32,10 @@ export const AuthProvider = ({ children }) => {
     }
   };
 
-  const login = async (email, password) => {
+  const login = async (email, password, organization) => {
     try {
       setError(null);
-      const response = await apiService.login(email, password);
+      const response = await apiService.login(email, password, organization);
       setUser(response.user);
       return response;
     } catch (error) {
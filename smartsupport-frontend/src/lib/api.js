@@ -35,11 +35,26 @@ class ApiService {
     }
   }
 
+  // Runs several GET requests in one round trip; paths are relative to the API base
+  async batch(paths) {
+    const response = await this.request('/batch', {
+      method: 'POST',
+      body: { requests: paths.map((path) => ({ method: 'GET', path: `/api${path}` })) },
+    });
+
+    return response.responses.map(({ status, body }) => {
+      if (status >= 400) {
+        throw new Error(body?.error || `HTTP error! status: ${status}`);
+      }
+      return body;
+    });
+  }
+
   // Authentication
-  async login(email, password) {
+  async login(email, password, organization) {
     return this.request('/auth/login', {
       method: 'POST',
-      body: { email, password },
+      body: { email, password, organization },
     });
   }
 
@@ -66,6 +81,13 @@ class ApiService {
     return this.request(`/tickets${queryString ? `?${queryString}` : ''}`);
   }
 
+  async checkDuplicateTickets(subject, description) {
+    return this.request('/tickets/duplicates', {
+      method: 'POST',
+      body: { subject, description },
+    });
+  }
+
   async getTicket(id) {
     return this.request(`/tickets/${id}`);
   }
@@ -101,6 +123,11 @@ class ApiService {
     return this.request(`/admin/users${queryString ? `?${queryString}` : ''}`);
   }
 
+  async searchUsers(q, params = {}) {
+    const queryString = new URLSearchParams({ q, ...params }).toString();
+    return this.request(`/admin/users/search?${queryString}`);
+  }
+
   async updateUser(id, userData) {
     return this.request(`/admin/users/${id}`, {
       method: 'PUT',